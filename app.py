@@ -1,24 +1,36 @@
 ﻿import flet as ft
 import os
-import shutil
-import csv
-import json
-from datetime import datetime, timedelta, date
+import asyncio
+import threading
+import time
+import logging
+from datetime import datetime, timedelta
 
 from db import (
     init_db,
     load_companies,
-    add_company,
-    add_inspection,
-    load_inspection_history,
-    update_company,
-    delete_company,
     get_data_dir,
+    get_data_dir_error,
     get_config_path,
-    DB_NAME
+    export_csv,
+    import_records,
+    load_companies_by_ids,
+    latest_change_seq,
+    changed_companies_since,
+    data_version,
+    get_db_path,
+    REPLICA_MODE,
 )
+from store import CompanyStore
+from tasks import Debouncer, JobRunner, PeriodicTask
+from status import StatusEngine, DUE_SOON, calculate_next_date
+from components import CompanyRow
+from config import config
+import async_db
 
-def main(page: ft.Page):
+log = logging.getLogger("annual_inspection")
+
+async def main(page: ft.Page):
     APP_VERSION = "1.0.2"
     page.title = "年次点検管理システム | Annual Inspection Tracker"
     page.window_width = 1200
@@ -42,19 +54,13 @@ def main(page: ft.Page):
             dlg.open = True
             page.update()
 
-    def ensure_data_dir():
-        try:
-            os.makedirs(data_dir, exist_ok=True)
-            test_file = os.path.join(data_dir, ".write_test")
-            with open(test_file, "w", encoding="utf-8") as f:
-                f.write("ok")
-            os.remove(test_file)
-            return True, ""
-        except Exception as e:
-            return False, str(e)
+    # Startup timing breakdown, logged after the first full render.
+    startup_marks = [("start", time.perf_counter())]
 
-    ok, err = ensure_data_dir()
-    if not ok:
+    def mark(step):
+        startup_marks.append((step, time.perf_counter()))
+
+    def show_data_path_error(err):
         dlg = ft.AlertDialog(
             title=ft.Text("Data Path Unavailable"),
             content=ft.Text(
@@ -73,89 +79,163 @@ def main(page: ft.Page):
         dlg.open = True
         page.add(ft.Text("Data path unavailable. Fix the share path or permissions, then restart the app.", color=ft.Colors.RED))
         page.update()
+
+    # db.py already probed the data folder once at import; reuse its result.
+    # A replica only needs its local copy, which is checked after first paint.
+    err = None if REPLICA_MODE else get_data_dir_error()
+    if err:
+        show_data_path_error(err)
         return
 
-    # Create DB/schema on first launch so fresh installs work.
-    init_db()                   # ✔ once
-    companies = load_companies() # ✔ safe
+    # The DB is opened and loaded after the first paint (finish_startup).
+    store = CompanyStore()
+    status_engine = StatusEngine(store)
+    view_lock = threading.RLock()
+    replica_sync = None
+
+    PROGRESS_INTERVAL_SECONDS = 0.1
+
+    # DB and file I/O run as jobs on worker threads; their callbacks are
+    # marshalled back onto the page's event loop like any other handler.
+    async def call_on_page(fn, *args):
+        fn(*args)
+
+    def on_page(fn, *args):
+        page.run_task(call_on_page, fn, *args)
+
+    def progress_on_page(fn, interval=PROGRESS_INTERVAL_SECONDS):
+        # Wraps a progress(done, total) UI callback for a worker thread: each
+        # report is dispatched to the page loop, at most once per interval
+        # (the final one always goes through).
+        last = 0.0
+
+        def report(done, total):
+            nonlocal last
+            now = time.monotonic()
+            if done < total and now - last < interval:
+                return
+            last = now
+            on_page(fn, done, total)
+        return report
+
+    busy_indicator = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
+    db_calls = 0
+
+    def set_busy(_=None):
+        busy = jobs.active + db_calls > 0
+        if busy_indicator.visible != busy:
+            busy_indicator.visible = busy
+            page.update()
+
+    jobs = JobRunner(dispatch=on_page, on_busy=set_busy)
 
+    # Short queries are awaited from async handlers through async_db (its
+    # own DB thread), so the event loop keeps rendering meanwhile.
+    async def db_call(fn, *args):
+        nonlocal db_calls
+        db_calls += 1
+        set_busy()
+        try:
+            return await fn(*args)
+        finally:
+            db_calls -= 1
+            set_busy()
 
-    edit_index = None
+    edit_id = None
     search_text = ""
     sort_by = "next"
     sort_reverse = False
+    page_index = 0
     page.session_notified = False
 
     def backup_database():
-        try:
-            db_file = DB_NAME
-            backup_dir = os.path.join(get_data_dir(), "backups")
+        from backup_store import create_snapshot, default_root as default_backup_root
 
-            if not os.path.exists(db_file):
-                dlg = ft.AlertDialog(
-                    title=ft.Text("Backup Failed"),
-                    content=ft.Text(f"Database file not found:\n{db_file}"),
-                    actions=[ft.TextButton("OK", on_click=lambda e: close_dialog(dlg))],
-                )
-                page.overlay.append(dlg)
-                dlg.open = True
-                page.update()
-                return
+        db_file = get_db_path()
+        backup_dir = default_backup_root()
+
+        progress_bar = ft.ProgressBar(value=0, width=360)
+        progress_label = ft.Text("0%", size=12, color=ft.Colors.GREY_700)
+        dlg = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("バックアップ中 | Backing up..."),
+            content=ft.Column([progress_bar, progress_label], tight=True),
+        )
+        page.overlay.append(dlg)
+        dlg.open = True
+        backup_button.disabled = True
+        page.update()
 
-            os.makedirs(backup_dir, exist_ok=True)
+        def on_progress(copied, total):
+            progress_bar.value = copied / total if total else 1
+            progress_label.value = f"{int(progress_bar.value * 100)}%"
+            page.update()
 
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = f"{backup_dir}/inspection_backup_{timestamp}.db"
+        # The SQLite backup API steps through pages on a worker thread, so
+        # the window stays responsive and the copy is always consistent.
+        # The snapshot store only keeps pages that changed since the last one.
+        def run():
+            if not os.path.exists(db_file):
+                raise FileNotFoundError(f"Database file not found:\n{db_file}")
+            return create_snapshot(backup_dir, progress=progress_on_page(on_progress))
+
+        def on_done(result):
+            if result["skipped"]:
+                dlg.title = ft.Text("変更なし | No Changes")
+                dlg.content = ft.Text(
+                    "前回のバックアップから変更はありません。\n"
+                    f"No changes since snapshot {result['id']}."
+                )
+            else:
+                dlg.title = ft.Text("バックアップ完了 | Backup Successful")
+                dlg.content = ft.Text(
+                    f"バックアップを作成しました: {result['id']}\n"
+                    f"{backup_dir}\n\n"
+                    f"{result['new_pages']} / {result['total_pages']} pages stored "
+                    f"({result['stored_bytes'] // 1024} KB)"
+                )
+            finish()
 
-            shutil.copy2(db_file, backup_file)
+        def on_error(e):
+            dlg.title = ft.Text("エラー | Backup Failed")
+            dlg.content = ft.Text(str(e))
+            finish()
 
-            dlg = ft.AlertDialog(
-                title=ft.Text("バックアップ完了 | Backup Successful"),
-                content=ft.Text(f"バックアップを作成しました:\n{backup_file}"),
-                actions=[ft.TextButton("OK", on_click=lambda e: close_dialog(dlg))],
-            )
-            page.overlay.append(dlg)
-            dlg.open = True
+        def finish():
+            dlg.modal = False
+            dlg.actions = [ft.TextButton("OK", on_click=lambda e: close_dialog(dlg))]
+            backup_button.disabled = False
             page.update()
 
-        except Exception as e:
-            dlg = ft.AlertDialog(
-                title=ft.Text("エラー | Backup Failed"),
-                content=ft.Text(str(e)),
-                actions=[ft.TextButton("OK", on_click=lambda e: close_dialog(dlg))],
-            )
-            page.overlay.append(dlg)
-            dlg.open = True
-            page.update()
-   
+        jobs.submit(run, on_done=on_done, on_error=on_error)
+
     def close_dialog(dlg):
         dlg.open = False
         page.update()
 
-    def show_monthly_backup_export_reminder():
-        month_key = datetime.now().strftime("%Y-%m")
-        config = {}
-
-        try:
-            if os.path.exists(config_path):
-                with open(config_path, "r", encoding="utf-8") as f:
-                    loaded = json.load(f)
-                    if isinstance(loaded, dict):
-                        config = loaded
-        except Exception:
-            config = {}
+    def show_message(title, text):
+        dlg = ft.AlertDialog(
+            title=ft.Text(title),
+            content=ft.Text(text),
+            actions=[ft.TextButton("OK", on_click=lambda e: close_dialog(dlg))],
+        )
+        page.overlay.append(dlg)
+        dlg.open = True
+        page.update()
 
+    def reminder_due_this_month():
+        # Config file I/O; runs on a worker thread.
+        month_key = datetime.now().strftime("%Y-%m")
         if config.get("last_backup_export_reminder_month") == month_key:
-            return
-
-        config["last_backup_export_reminder_month"] = month_key
+            return False
         try:
-            with open(config_path, "w", encoding="utf-8") as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
-        except Exception:
+            config.set("last_backup_export_reminder_month", month_key)
+        except OSError:
             # If config write fails, continue showing reminder for safety.
             pass
+        return True
 
+    def show_monthly_backup_export_reminder():
         dlg = ft.AlertDialog(
             title=ft.Text("Monthly Reminder | 月次リマインダー"),
             content=ft.Text(
@@ -172,150 +252,288 @@ def main(page: ft.Page):
         dlg.open = True
         page.update()
 
-    # ── Status Logic (Calendar Month Based) ───────────────────────
-    def get_warning_start_date(next_date_obj):
-        year = next_date_obj.year
-        month = next_date_obj.month - 2
-        if month <= 0:
-            month += 12
-            year -= 1
-        return date(year, month, 1)
-
-    def get_status_info(next_str: str):
-        if not next_str:
-            return "未点検 | No data", ft.Colors.GREY_700, ft.Colors.GREY_100
-        today = datetime.now().date()
-        next_dt = datetime.strptime(next_str, "%Y-%m-%d").date()
-        warning_start = get_warning_start_date(next_dt)
-
-        if today > next_dt:
-            return "🚨 期限切れ | Expired", ft.Colors.RED_700, ft.Colors.RED_50
-        elif today >= warning_start:
-            return "⚠️ 期限間近 | Due Soon", ft.Colors.ORANGE_700, ft.Colors.ORANGE_50
-        else:
-            return "✅ 正常 | OK", ft.Colors.GREEN_700, ft.Colors.GREEN_50
-
-    def calculate_next_date(done_date):
-        # Rule: next date = same calendar day next year, minus one day.
-        try:
-            same_day_next_year = done_date.replace(year=done_date.year + 1)
-        except ValueError:
-            # Handle Feb 29 -> Feb 28 for non-leap years.
-            same_day_next_year = done_date.replace(year=done_date.year + 1, day=28)
-        return same_day_next_year - timedelta(days=1)
-
+    # ── Status presentation (classification lives in status.py) ──
     def export_to_csv():
-        try:
+        history_check = ft.Checkbox(label="全履歴 | Full history", value=False)
+        gzip_check = ft.Checkbox(label="gzip圧縮 | Compress (.gz)", value=False)
+        progress_bar = ft.ProgressBar(value=0, width=360, visible=False)
+        progress_label = ft.Text("", size=12, color=ft.Colors.GREY_700)
+
+        def start(e):
             export_dir = os.path.join(get_data_dir(), "exports")
-            os.makedirs(export_dir, exist_ok=True)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            export_file = f"{export_dir}/inspection_export_{timestamp}.csv"
-
-            with open(export_file, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["Company", "Last", "Next", "Status", "Notes"])
-                for c in companies:
-                    status_text, _, _ = get_status_info(c["next"])
-                    writer.writerow([c["name"], c["done"] or "", c["next"] or "", status_text, c.get("notes", "") or ""])
-
-            dlg = ft.AlertDialog(
-                title=ft.Text("Export Successful"),
-                content=ft.Text(f"CSV exported:\n{export_file}"),
-                actions=[ft.TextButton("OK", on_click=lambda e: close_dialog(dlg))],
-            )
-            page.overlay.append(dlg)
-            dlg.open = True
-            page.update()
-        except Exception as e:
-            dlg = ft.AlertDialog(
-                title=ft.Text("Export Failed"),
-                content=ft.Text(str(e)),
-                actions=[ft.TextButton("OK", on_click=lambda e: close_dialog(dlg))],
-            )
-            page.overlay.append(dlg)
-            dlg.open = True
+            suffix = "_history" if history_check.value else ""
+            export_file = f"{export_dir}/inspection_export{suffix}_{timestamp}.csv"
+            if gzip_check.value:
+                export_file += ".gz"
+
+            history_check.disabled = gzip_check.disabled = True
+            progress_bar.visible = True
+            dlg.actions = []
+            export_button.disabled = True
             page.update()
 
-    # ── Table update ──────────────────────────────────────────────
-    def update_table():
-        data_table.rows.clear()
-        
-        # Filtering
-        visible_list = [c for c in companies if search_text.lower() in c["name"].lower()]
-        
-        # Sorting
-        if sort_by == "next":
-            visible_list.sort(key=lambda c: c["next"], reverse=sort_reverse)
-        else:
-            visible_list.sort(key=lambda c: c["name"].lower(), reverse=sort_reverse)
+            def on_progress(rows, total):
+                progress_bar.value = rows / total if total else 1
+                progress_label.value = f"{rows} / {total} rows"
+                page.update()
 
-        urgent_names = []
-        today = datetime.now().date()
+            # Streams from a DB cursor on a worker thread; the window stays usable.
+            def run():
+                os.makedirs(export_dir, exist_ok=True)
+                return export_csv(
+                    export_file,
+                    history=history_check.value,
+                    compress=gzip_check.value,
+                    progress=progress_on_page(on_progress),
+                )
 
-        for c in visible_list:
-            status_text, status_color, row_bg = get_status_info(c["next"])
-            done_display = c["done"] if c["done"] else "-"
-            next_display = c["next"] if c["next"] else "-"
-            
-            # Notification Check
-            if c["next"]:
-                next_dt = datetime.strptime(c["next"], "%Y-%m-%d").date()
-                if today >= get_warning_start_date(next_dt) and today <= next_dt:
-                    urgent_names.append(c["name"])
-
-            this_id = c.get("id")
-            this_name = c.get("name")
-
-            def show_history(cid, cname):
-                history = load_inspection_history(cid)
-                if history:
-                    items = []
-                    for h in history:
-                        note = h["notes"] if h["notes"] else "-"
-                        items.append(
-                            ft.Text(f"{h['done']} → {h['next']} | {note}")
-                        )
-                    content = ft.Column(items, spacing=6, scroll=ft.ScrollMode.AUTO)
-                else:
-                    content = ft.Text("No history yet.")
-
-                dlg = ft.AlertDialog(
-                    title=ft.Text(f"History: {cname}"),
-                    content=content,
-                    actions=[ft.TextButton("OK", on_click=lambda e: close_dialog(dlg))],
+            def on_done(result):
+                dlg.title = ft.Text("Export Successful")
+                dlg.content = ft.Text(
+                    f"CSV exported:\n{result['path']}\n\n"
+                    f"{result['rows']} rows in {result['seconds']:.2f}s "
+                    f"({result['rows_per_sec']:.0f} rows/s)"
                 )
-                page.overlay.append(dlg)
-                dlg.open = True
+                finish()
+
+            def on_error(ex):
+                dlg.title = ft.Text("Export Failed")
+                dlg.content = ft.Text(str(ex))
+                finish()
+
+            def finish():
+                dlg.actions = [ft.TextButton("OK", on_click=lambda e: close_dialog(dlg))]
+                export_button.disabled = False
                 page.update()
 
-            edit_btn = ft.TextButton(
-                content=ft.Row([ft.Icon(ft.Icons.EDIT, color=ft.Colors.BLUE, size=18), ft.Text("編集 | Edit", size=12)]),
-                on_click=lambda e, tid=this_id: edit_company_by_id(tid)
-            )
-            delete_btn = ft.TextButton(
-                content=ft.Row([ft.Icon(ft.Icons.DELETE, color=ft.Colors.RED, size=18), ft.Text("削除 | Delete", size=12)]),
-                on_click=lambda e, tid=this_id, nm=this_name: confirm_delete(tid, nm)
-            )
-            history_btn = ft.TextButton(
-                content=ft.Row([ft.Icon(ft.Icons.HISTORY, color=ft.Colors.GREY_700, size=18), ft.Text("履歴 | History", size=12)]),
-                on_click=lambda e, tid=this_id, nm=this_name: show_history(tid, nm)
-            )
+            jobs.submit(run, on_done=on_done, on_error=on_error)
 
-            data_table.rows.append(
-                ft.DataRow(
-                    color=row_bg,
-                    cells=[
-                        ft.DataCell(ft.Container(ft.Text(c["name"], weight=ft.FontWeight.W_500), width=col_widths[0])),
-                        ft.DataCell(ft.Container(ft.Text(done_display), width=col_widths[1])),
-                        ft.DataCell(ft.Container(ft.Text(next_display), width=col_widths[2])),
-                        ft.DataCell(ft.Container(ft.Text(status_text, color=status_color, weight=ft.FontWeight.BOLD), width=col_widths[3])),
-                        ft.DataCell(ft.Container(ft.Row([edit_btn, history_btn, delete_btn], spacing=8), width=col_widths[4])),
-                    ]
+        dlg = ft.AlertDialog(
+            title=ft.Text("Export CSV"),
+            content=ft.Column([history_check, gzip_check, progress_bar, progress_label], tight=True),
+            actions=[
+                ft.TextButton("キャンセル | Cancel", on_click=lambda e: close_dialog(dlg)),
+                ft.FilledButton("Export", icon=ft.Icons.FILE_DOWNLOAD, on_click=start),
+            ],
+        )
+        page.overlay.append(dlg)
+        dlg.open = True
+        page.update()
+
+    async def import_from_csv(e):
+        files = await ft.FilePicker().pick_files(
+            dialog_title="Import CSV",
+            file_type=ft.FilePickerFileType.CUSTOM,
+            allowed_extensions=["csv", "gz"],
+        )
+        if not files or not files[0].path:
+            return
+        path = files[0].path
+
+        from importer import parse_csv
+
+        # Keyed: picking another file while one is still parsing supersedes
+        # it, so only the latest file's preview is shown.
+        jobs.submit(
+            parse_csv, path,
+            on_done=lambda parsed: show_import_preview(path, *parsed),
+            on_error=lambda ex: show_message("Import Failed", str(ex)),
+            key="import-parse",
+        )
+
+    def show_import_preview(path, records, errors):
+        lines = [f"{len(records)} rows ready to import from:\n{path}"]
+        if errors:
+            lines.append(f"\n{len(errors)} rows skipped:")
+            lines.extend(f"  line {n}: {msg}" for n, msg in errors[:10])
+            if len(errors) > 10:
+                lines.append("  ...")
+        summary_text = ft.Text("\n".join(lines))
+        progress_bar = ft.ProgressBar(value=0, width=360, visible=False)
+
+        def start(e):
+            progress_bar.visible = True
+            dlg.actions = []
+            import_button.disabled = True
+            page.update()
+
+            def on_progress(rows, total):
+                progress_bar.value = rows / total if total else 1
+                page.update()
+
+            def run():
+                return import_records(records, progress=progress_on_page(on_progress)), load_companies()
+
+            def on_done(outcome):
+                result, rows = outcome
+                with view_lock:
+                    store.reload(rows)
+                update_table()
+                dlg.title = ft.Text("Import Successful")
+                dlg.content = ft.Text(
+                    f"Companies added: {result['companies_added']}\n"
+                    f"Companies matched: {result['companies_matched']}\n"
+                    f"Inspections added: {result['inspections_added']}\n"
+                    f"Duplicates skipped: {result['duplicates_skipped']}"
                 )
+                finish()
+
+            def on_error(ex):
+                dlg.title = ft.Text("Import Failed")
+                dlg.content = ft.Text(str(ex))
+                finish()
+
+            def finish():
+                dlg.actions = [ft.TextButton("OK", on_click=lambda e: close_dialog(dlg))]
+                import_button.disabled = False
+                page.update()
+
+            jobs.submit(run, on_done=on_done, on_error=on_error)
+
+        dlg = ft.AlertDialog(
+            title=ft.Text("Import CSV"),
+            content=ft.Column([summary_text, progress_bar], tight=True, scroll=ft.ScrollMode.AUTO),
+            actions=[
+                ft.TextButton("キャンセル | Cancel", on_click=lambda e: close_dialog(dlg)),
+                ft.FilledButton("Import", icon=ft.Icons.FILE_UPLOAD, on_click=start, disabled=not records),
+            ],
+        )
+        page.overlay.append(dlg)
+        dlg.open = True
+        page.update()
+
+    # ── Table update ──────────────────────────────────────────────
+    def history_item(h):
+        note = h["notes"] if h["notes"] else "-"
+        return ft.Text(f"{h['done']} → {h['next']} | {note}")
+
+    history_request = 0
+
+    async def show_history(cid, cname):
+        # First page only; older pages load when scrolled near the end.
+        # Opening another history supersedes a load still in flight.
+        nonlocal history_request
+        history_request += 1
+        request = history_request
+        try:
+            history, cursor = await db_call(async_db.load_inspection_history_page, cid)
+        except Exception as e:
+            show_message("History Failed", str(e))
+            return
+        if request == history_request:
+            open_history(cid, cname, history, cursor)
+
+    def open_history(cid, cname, history, cursor):
+        if history:
+            loading = False
+
+            async def load_more(_=None):
+                nonlocal cursor, loading
+                if cursor is None or loading:
+                    return
+                loading = True
+                try:
+                    rows, cursor = await db_call(async_db.load_inspection_history_page, cid, cursor)
+                finally:
+                    loading = False
+                history_list.controls[-1:-1] = [history_item(h) for h in rows]
+                load_more_button.visible = cursor is not None
+                history_list.update()
+
+            async def on_scroll(e):
+                if e.max_scroll_extent - e.pixels < 200:
+                    await load_more()
+
+            load_more_button = ft.TextButton("さらに表示 | Load more", on_click=load_more, visible=cursor is not None)
+            history_list = ft.ListView(
+                [history_item(h) for h in history] + [load_more_button],
+                spacing=6,
+                width=520,
+                height=400,
+                scroll_interval=100,
+                on_scroll=on_scroll,
             )
+            content = history_list
+        else:
+            content = ft.Text("No history yet.")
+
+        dlg = ft.AlertDialog(
+            title=ft.Text(f"History: {cname}"),
+            content=content,
+            actions=[ft.TextButton("OK", on_click=lambda e: close_dialog(dlg))],
+        )
+        page.overlay.append(dlg)
+        dlg.open = True
+        page.update()
+
+    async def show_history_by_id(tid):
+        c = store.get(tid)
+        if c is not None:
+            await show_history(tid, c["name"])
 
-        # ── Trigger Notification ──
-        # ── Trigger Notification using Alert Dialog ──
+    def confirm_delete_by_id(tid):
+        c = store.get(tid)
+        if c is not None:
+            confirm_delete(tid, c["name"])
+
+    # Keyed row cache: company id -> CompanyRow, reused across renders.
+    row_cache = {}
+    row_actions = {
+        "edit": lambda cid: edit_company_by_id(cid),
+        "history": lambda cid: page.run_task(show_history_by_id, cid),
+        "delete": confirm_delete_by_id,
+    }
+
+    def update_table():
+        # Every render runs on the page loop (handlers, debouncers, job and
+        # refresh callbacks are all dispatched there).
+        with view_lock:
+            render_table()
+
+    def render_table():
+        nonlocal page_index
+        # Filtering via the store's normalized search index, already sorted
+        visible_list = store.search(search_text, sort_by, sort_reverse)
+
+        # One batch classification, cached by the engine
+        statuses = status_engine.statuses()
+
+        # Windowing: only the current page exists as controls.
+        total = len(visible_list)
+        page_count = max(1, (total + PAGE_SIZE - 1) // PAGE_SIZE)
+        page_index = min(page_index, page_count - 1)
+        start = page_index * PAGE_SIZE
+        window = visible_list[start:start + PAGE_SIZE]
+
+        rows = []
+        for c in window:
+            company_row = row_cache.get(c["id"])
+            if company_row is None:
+                company_row = row_cache[c["id"]] = CompanyRow(c["id"], row_actions, col_widths)
+            company_row.update(c, statuses[c["id"]])
+            rows.append(company_row.row)
+
+        window_ids = {c["id"] for c in window}
+        for cid in [cid for cid in row_cache if cid not in window_ids]:
+            del row_cache[cid]
+
+        if total:
+            row_count_text.value = f"{start + 1}–{start + len(window)} / {total} 件 | rows"
+        else:
+            row_count_text.value = "0 件 | rows"
+        prev_page_button.disabled = page_index == 0
+        next_page_button.disabled = page_index >= page_count - 1
+
+        if len(rows) != len(data_table.rows) or any(a is not b for a, b in zip(rows, data_table.rows)):
+            data_table.rows[:] = rows
+
+        page.update()
+
+    # ── Trigger Notification using Alert Dialog ──
+    def show_inspection_reminder(due_soon):
+        # Due-soon rows come straight from the indexed status columns in SQL.
+        urgent_names = [c["name"] for c in due_soon]
         if urgent_names and not page.session_notified:
             def close_dlg(e):
                 alert_dlg.open = False
@@ -338,10 +556,13 @@ def main(page: ft.Page):
             page.overlay.append(alert_dlg)
             alert_dlg.open = True
             page.session_notified = True # Set this so it only pops up once per app start
-            
-        page.update()
+            page.update()
 
     # ── UI Components & Fixed Alignment ───────────────────────────
+    PAGE_SIZE = 100
+    SEARCH_DEBOUNCE_SECONDS = 0.3
+    REFRESH_INTERVAL_SECONDS = 5
+    RESIZE_DEBOUNCE_SECONDS = 0.15
     base_col_widths = [240, 140, 140, 170, 280]
     min_col_widths = [190, 110, 110, 130, 220]
 
@@ -396,12 +617,31 @@ def main(page: ft.Page):
             header_cells[i].width = w
             data_col_spacers[i].width = w
 
-    def on_resize(e):
-        apply_col_widths(compute_col_widths())
-        update_table()
+    def relayout():
+        # Only container widths change on resize: the header cells, the
+        # spacer columns and the cached rows. No query, no re-render.
+        widths = compute_col_widths()
+        with view_lock:
+            if widths == col_widths:
+                return
+            apply_col_widths(widths)
+            for company_row in row_cache.values():
+                company_row.set_widths(widths)
         page.update()
 
-    page.on_resize = on_resize
+    # A window drag fires resize events continuously; relayout once it
+    # pauses, on the page loop.
+    resize_debouncer = Debouncer(RESIZE_DEBOUNCE_SECONDS, relayout, dispatch=on_page)
+    page.on_resize = lambda e: resize_debouncer()
+
+    row_count_text = ft.Text("", size=12, color=ft.Colors.GREY_700)
+    prev_page_button = ft.IconButton(ft.Icons.CHEVRON_LEFT, tooltip="前へ | Previous", on_click=lambda _: change_page(-1))
+    next_page_button = ft.IconButton(ft.Icons.CHEVRON_RIGHT, tooltip="次へ | Next", on_click=lambda _: change_page(1))
+    pager = ft.Row(
+        [row_count_text, prev_page_button, next_page_button],
+        alignment=ft.MainAxisAlignment.END,
+        spacing=4,
+    )
 
     main_table_container = ft.Container(
         content=ft.Column(
@@ -412,6 +652,7 @@ def main(page: ft.Page):
                     expand=True,
                     bgcolor=ft.Colors.WHITE,
                 ),
+                pager,
             ],
             expand=True,
             spacing=0,
@@ -425,21 +666,110 @@ def main(page: ft.Page):
 
     # ── Logic Actions ─────────────────────────────────────────────
     def on_search(val):
-        nonlocal search_text
+        nonlocal search_text, page_index
         search_text = val
+        page_index = 0
         update_table()
 
+    # Keystrokes are coalesced off the UI callback; only the final query
+    # renders, back on the page loop.
+    search_debouncer = Debouncer(SEARCH_DEBOUNCE_SECONDS, on_search, dispatch=on_page)
+
     def toggle_sort(key):
-        nonlocal sort_by, sort_reverse
+        nonlocal sort_by, sort_reverse, page_index
         if sort_by == key:
             sort_reverse = not sort_reverse
         else:
             sort_by = key
             sort_reverse = False
+        page_index = 0
+        update_table()
+
+    def change_page(step):
+        nonlocal page_index
+        page_index = max(0, page_index + step)
         update_table()
 
-    def add_or_update():
-        nonlocal edit_index, companies
+    async def reconcile_if_due():
+        with view_lock:
+            if not store.due_for_reconcile():
+                return
+            version = store.version
+        rows = await db_call(async_db.load_companies)
+        # Skipped if the view changed meanwhile; retried on the next edit.
+        with view_lock:
+            if store.version == version:
+                store.reload(rows)
+
+    # ── Live refresh from other app instances ─────────────────────
+    last_data_version = None
+    last_change_seq = 0
+
+    def check_for_changes():
+        # Runs on the watcher thread, which does the DB reads; the view and
+        # the sync status are patched on the page loop.
+        # PRAGMA data_version only moves when another connection commits;
+        # then the change log says exactly which companies to re-read.
+        nonlocal last_data_version, last_change_seq
+        if replica_sync is not None:
+            on_page(show_sync_status, replica_sync.stats())
+        version = data_version()
+        if version == last_data_version:
+            return
+        with view_lock:
+            view_version = store.version
+        seq, changed = changed_companies_since(last_change_seq)
+        fresh = load_companies_by_ids(changed) if changed else []
+        # Recorded only once the reads succeeded, so a failed tick is retried.
+        last_data_version, last_change_seq = version, seq
+        if changed:
+            on_page(apply_changes, changed, fresh, view_version)
+
+    def apply_changes(changed, fresh, view_version):
+        with view_lock:
+            if store.version != view_version:
+                # A local save or delete landed after the read: these rows
+                # may be stale, so re-read them rather than overwrite it.
+                page.run_task(refetch_changes, changed)
+                return
+            for cid in changed - {row["id"] for row in fresh}:
+                store.delete(cid)
+            for row in fresh:
+                store.upsert(row)
+            render_table()
+
+    async def refetch_changes(changed):
+        with view_lock:
+            view_version = store.version
+        fresh = await db_call(async_db.load_companies_by_ids, changed)
+        apply_changes(changed, fresh, view_version)
+
+    def on_watch_error(e):
+        log.warning("live refresh failed: %s", e, exc_info=e)
+
+    change_watcher = PeriodicTask(REFRESH_INTERVAL_SECONDS, check_for_changes, on_error=on_watch_error)
+
+    sync_status_text = ft.Text("", size=12, color=ft.Colors.GREY_600, visible=REPLICA_MODE)
+
+    def show_sync_status(stats):
+        pending = stats["pending"] or 0
+        if stats["last_error"]:
+            sync_status_text.value = f"⚠️ オフライン | Offline ({pending} pending)"
+            sync_status_text.color = ft.Colors.ORANGE_800
+            sync_status_text.tooltip = stats["last_error"]
+        elif stats["last_sync"] is None:
+            sync_status_text.value = f"同期待ち | Sync pending ({pending})"
+            sync_status_text.color = ft.Colors.GREY_600
+            sync_status_text.tooltip = None
+        else:
+            suffix = f", {pending} pending" if pending else ""
+            sync_status_text.value = f"同期済み | Synced {stats['last_sync']:%H:%M}{suffix}"
+            sync_status_text.color = ft.Colors.GREY_600
+            sync_status_text.tooltip = None
+        sync_status_text.update()
+
+    async def add_or_update(e=None):
+        nonlocal edit_id
 
         if not company_name.value or not date_picker.value:
             return
@@ -449,33 +779,46 @@ def main(page: ft.Page):
         next_s = calculate_next_date(adj.date()).strftime("%Y-%m-%d")
         notes_s = notes_text.value or ""
 
-        if edit_index is not None:
-            cid = companies[edit_index]["id"]
-            update_company(cid, company_name.value)
-            add_inspection(cid, done_s, next_s, notes_s)
-            edit_index = None
+        # Company and inspection are written in one transaction on the DB thread.
+        add_button.disabled = True
+        page.update()
+        try:
+            row = await db_call(
+                async_db.save_company_with_inspection, edit_id, company_name.value, done_s, next_s, notes_s
+            )
+        except Exception as ex:
+            add_button.disabled = False
+            show_message("Save Failed", str(ex))
+            return
+        if edit_id is not None:
+            edit_id = None
             add_button.text = "リストに追加 | Add to List"
-        else:
-            cid = add_company(company_name.value)
-            add_inspection(cid, done_s, next_s, notes_s)
+        add_button.disabled = False
+        with view_lock:
+            store.upsert(row)
 
         company_name.value = ""
         notes_text.value = ""
         date_picker.value = None
         selected_date_display.value = "未選択 | Not selected"
 
-        companies = load_companies()
         update_table()
+        await reconcile_if_due()
 
 
     def confirm_delete(tid, nm):
-        def on_delete(e):
-            nonlocal companies
-            delete_company(tid)
-            companies = load_companies()
-            update_table()
+        async def on_delete(e):
             dlg.open = False
             page.update()
+            try:
+                await db_call(async_db.delete_company, tid)
+            except Exception as ex:
+                show_message("Delete Failed", str(ex))
+                return
+            with view_lock:
+                store.delete(tid)
+            update_table()
+            await reconcile_if_due()
 
         dlg = ft.AlertDialog(
             title=ft.Text(" 🚨 削除確認 | Delete Confirmation"),
@@ -499,26 +842,39 @@ def main(page: ft.Page):
 
 
     def edit_company_by_id(tid):
-        nonlocal edit_index
-        for idx, c in enumerate(companies):
-            if c.get("id") == tid:
-                edit_index = idx
-                company_name.value = c["name"]
-                if c.get("done"):
-                    date_picker.value = datetime.strptime(c["done"], "%Y-%m-%d")
-                    selected_date_display.value = c["done"]
-                else:
-                    date_picker.value = None
-                    selected_date_display.value = "未選択 | Not selected"
-                notes_text.value = ""
-                add_button.text = " 🔄 更新する | Update"
-                page.update(); break
-
-    add_button = ft.FilledButton("💾 リストに追加 | Add to List", icon=ft.Icons.ADD, on_click=lambda _: add_or_update())
+        nonlocal edit_id
+        c = store.get(tid)
+        if c is None:
+            return
+        edit_id = tid
+        company_name.value = c["name"]
+        if c.get("done"):
+            date_picker.value = datetime.strptime(c["done"], "%Y-%m-%d")
+            selected_date_display.value = c["done"]
+        else:
+            date_picker.value = None
+            selected_date_display.value = "未選択 | Not selected"
+        notes_text.value = ""
+        add_button.text = " 🔄 更新する | Update"
+        page.update()
+
+    add_button = ft.FilledButton("💾 リストに追加 | Add to List", icon=ft.Icons.ADD, on_click=add_or_update)
+    backup_button = ft.FilledButton(
+        " 📦 バックアップ | Backup",
+        icon=ft.Icons.BACKUP,
+        on_click=lambda _: backup_database(),
+    )
+    import_button = ft.OutlinedButton("Import CSV", icon=ft.Icons.FILE_UPLOAD, on_click=import_from_csv)
     export_button = ft.OutlinedButton("Export CSV", icon=ft.Icons.FILE_DOWNLOAD, on_click=lambda _: export_to_csv())
-    search_field = ft.TextField(label="検索 | Search", prefix_icon=ft.Icons.SEARCH, expand=True, on_change=lambda e: on_search(e.control.value))
+    search_field = ft.TextField(label="検索 | Search", prefix_icon=ft.Icons.SEARCH, expand=True, on_change=lambda e: search_debouncer(e.control.value))
     
 
+    # Disabled until finish_startup() has opened the database.
+    startup_buttons = (add_button, backup_button, import_button, export_button)
+    for button in startup_buttons:
+        button.disabled = True
+    row_count_text.value = "読み込み中 | Loading..."
+
     # ── Final Layout (Fine-Tuned) ──────────────────────────────
     # ── Final Layout (Compact & Full Width) ──────────────────────
     page.add(
@@ -528,6 +884,8 @@ def main(page: ft.Page):
                 [
                     ft.Text(" 🪪 年次点検管理システム | Annual Inspection Management System", size=28, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE_900),
                     ft.Container(expand=True),
+                    busy_indicator,
+                    sync_status_text,
                     ft.Text(f"Version {APP_VERSION}", size=12, color=ft.Colors.GREY_600),
                 ],
                 alignment=ft.MainAxisAlignment.START,
@@ -550,6 +908,7 @@ def main(page: ft.Page):
                         selected_date_display,
                         add_button,
                         ft.Container(expand=True),
+                        import_button,
                         export_button,
                     ], alignment=ft.MainAxisAlignment.START), # Aligns everything to the left
                 ], spacing=10),
@@ -563,11 +922,7 @@ def main(page: ft.Page):
                 search_field,
                 ft.TextButton("日付順 | Date Sort", icon=ft.Icons.SORT, on_click=lambda _: toggle_sort("next")),
                 ft.TextButton("名前順 | Name Sort", icon=ft.Icons.SORT_BY_ALPHA, on_click=lambda _: toggle_sort("name")),
-                ft.FilledButton(
-                    " 📦 バックアップ | Backup",
-                    icon=ft.Icons.BACKUP,
-                    on_click=lambda _: backup_database(),
-                ),
+                backup_button,
             ], alignment=ft.MainAxisAlignment.START),
             
 
@@ -580,8 +935,60 @@ def main(page: ft.Page):
         ], expand=True, spacing=15)
     )
 
-    show_monthly_backup_export_reminder()
+    mark("first paint")
+
+    def load_startup():
+        # Runs on the DB thread after the first paint: replica seeding,
+        # schema check and the initial load.
+        nonlocal last_data_version, last_change_seq
+        if REPLICA_MODE:
+            import replica
+            replica.prepare()
+            mark("replica")
+        init_db()
+        mark("schema")
+        last_data_version = data_version()
+        last_change_seq = latest_change_seq()
+        rows = load_companies()
+        mark("load")
+        return rows
+
+    try:
+        rows = await db_call(async_db.run, load_startup)
+    except Exception as e:
+        show_data_path_error(str(e))
+        return
+    with view_lock:
+        store.reload(rows)
+    for button in startup_buttons:
+        button.disabled = False
     update_table()
+    mark("render")
+    log.info(
+        "startup: %s",
+        ", ".join(
+            f"{step} {(t - prev) * 1000:.0f}ms"
+            for (_, prev), (step, t) in zip(startup_marks, startup_marks[1:])
+        ),
+    )
+
+    change_watcher.start()
+    if REPLICA_MODE:
+        import replica
+        replica_sync = replica.ReplicaSync().start()
+
+    # The due-soon query (DB thread) and the reminder's config file I/O
+    # (worker thread) overlap instead of running back to back.
+    due_soon, reminder_due = await asyncio.gather(
+        db_call(async_db.load_by_status, DUE_SOON),
+        asyncio.to_thread(reminder_due_this_month),
+        return_exceptions=True,
+    )
+    if reminder_due is True:
+        show_monthly_backup_export_reminder()
+    if isinstance(due_soon, list):
+        show_inspection_reminder(due_soon)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
     ft.run(main)
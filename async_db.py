@@ -0,0 +1,103 @@
+# async_db.py
+#
+# Awaitable versions of the db.py data-access functions for async Flet
+# handlers. Calls are queued to one dedicated DB thread (db.py serializes
+# on a single connection anyway), so awaiting a query never blocks the
+# event loop: rendering and other handlers keep running while it is in
+# flight. Long file jobs (backup, CSV export/import) stay on tasks.JobRunner.
+import asyncio
+import functools
+import queue
+import threading
+
+import db
+
+
+def _resolve(future, ok, value):
+    if future.done():
+        return
+    if ok:
+        future.set_result(value)
+    else:
+        future.set_exception(value)
+
+
+class DBThread:
+    # Runs queued (fn, args) requests one at a time on a daemon thread and
+    # completes each caller's asyncio future on the caller's loop.
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.calls = 0
+
+    def call(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="db", daemon=True)
+                self._thread.start()
+            self.calls += 1
+        self._queue.put((fn, args, kwargs, loop, future))
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fn, args, kwargs, loop, future = item
+            if future.cancelled():
+                # The awaiting handler gave up before the query started.
+                continue
+            try:
+                ok, value = True, fn(*args, **kwargs)
+            except Exception as e:
+                ok, value = False, e
+            try:
+                loop.call_soon_threadsafe(_resolve, future, ok, value)
+            except RuntimeError:
+                # The caller's loop has closed (session ended).
+                pass
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def stop(self):
+        self._queue.put(None)
+
+
+_db_thread = DBThread()
+
+def _wrap(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await _db_thread.call(fn, *args, **kwargs)
+    return wrapper
+
+def pending():
+    return _db_thread.pending()
+
+async def run(fn, *args, **kwargs):
+    # Any other blocking DB-bound callable, on the same DB thread.
+    return await _db_thread.call(fn, *args, **kwargs)
+
+
+init_db = _wrap(db.init_db)
+load_companies = _wrap(db.load_companies)
+load_companies_by_ids = _wrap(db.load_companies_by_ids)
+load_inspection_history = _wrap(db.load_inspection_history)
+load_inspection_history_page = _wrap(db.load_inspection_history_page)
+load_by_status = _wrap(db.load_by_status)
+count_by_status = _wrap(db.count_by_status)
+load_due_between = _wrap(db.load_due_between)
+latest_change_seq = _wrap(db.latest_change_seq)
+changed_companies_since = _wrap(db.changed_companies_since)
+data_version = _wrap(db.data_version)
+add_company = _wrap(db.add_company)
+update_company = _wrap(db.update_company)
+add_inspection = _wrap(db.add_inspection)
+save_company_with_inspection = _wrap(db.save_company_with_inspection)
+delete_company = _wrap(db.delete_company)
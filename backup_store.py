@@ -0,0 +1,260 @@
+# backup_store.py
+#
+# Deduplicated snapshot store for the inspection database.
+#
+#   <root>/objects/<hh>/<sha256>   zlib-compressed DB pages, named by content hash
+#   <root>/snapshots/<id>.json     manifest: page size + ordered page hashes
+#
+# A snapshot only writes the pages no earlier snapshot already stored, an
+# unchanged database is not snapshotted at all, and old snapshots are pruned
+# with a grandfather-father-son policy. The change_log sequence recorded in
+# each manifest lets an unchanged database be detected without copying it;
+# sequences only compare within one database, so the manifest also records
+# its source (host and path) and the shortcut applies only when it matches.
+#
+# Several instances share the store without a lock: snapshot ids carry a
+# random suffix, a snapshot touches every page object it reuses, and prune
+# only deletes unreferenced objects untouched for OBJECT_GRACE_SECONDS, so
+# it never removes pages a snapshot still being written relies on.
+#
+# CLI:  python backup_store.py list
+#       python backup_store.py restore <snapshot_id> <dest.db>
+import argparse
+import hashlib
+import json
+import os
+import socket
+import time
+import uuid
+import zlib
+from datetime import datetime
+
+from db import backup_to, get_data_dir, get_db_path, latest_change_seq
+
+# Grandfather-father-son retention: newest snapshot per day / ISO week / month.
+KEEP_DAILY = 7
+KEEP_WEEKLY = 4
+KEEP_MONTHLY = 12
+OBJECT_GRACE_SECONDS = 24 * 3600
+
+
+def default_root():
+    return os.path.join(get_data_dir(), "backups", "store")
+
+def _page_size(header):
+    # Big-endian u16 at offset 16 of the SQLite header; 1 means 65536.
+    size = int.from_bytes(header[16:18], "big")
+    return 65536 if size == 1 else size
+
+def _object_path(root, digest):
+    return os.path.join(root, "objects", digest[:2], digest)
+
+def _write_atomic(path, data):
+    # Unique temp name: another instance may be writing the same object.
+    tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.part"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def list_snapshots(root=None):
+    root = root or default_root()
+    snap_dir = os.path.join(root, "snapshots")
+    if not os.path.isdir(snap_dir):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(snap_dir)):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(snap_dir, name), "r", encoding="utf-8") as f:
+                    snapshots.append(json.load(f))
+            except FileNotFoundError:
+                # Pruned by another instance meanwhile.
+                continue
+    return snapshots
+
+def _touch(path):
+    # Marks an existing object as in use, so a concurrent prune's grace
+    # period keeps it. False when it does not exist (any more).
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def _source():
+    # Identifies the database a snapshot was taken from: every instance
+    # (host) has its own local replica, possibly at the same path.
+    return f"{socket.gethostname()}:{os.path.abspath(get_db_path())}"
+
+def create_snapshot(root=None, progress=None, now=None):
+    # Returns a summary dict; "skipped" is True when nothing changed since
+    # the newest snapshot.
+    root = root or default_root()
+    now = now or datetime.now()
+    os.makedirs(os.path.join(root, "snapshots"), exist_ok=True)
+    os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+    # Nothing logged since the newest snapshot of this same database: skip
+    # without copying at all. Another replica's sequence says nothing here.
+    source = _source()
+    change_seq = latest_change_seq()
+    snapshots = list_snapshots(root)
+    if (
+        snapshots
+        and snapshots[-1].get("source") == source
+        and snapshots[-1].get("change_seq") == change_seq
+    ):
+        return {"skipped": True, "id": snapshots[-1]["id"], "new_pages": 0, "stored_bytes": 0, "pruned": []}
+
+    # Sorts chronologically (list_snapshots() orders by id); the random
+    # suffix keeps two instances' snapshots apart.
+    snapshot_id = f"{now:%Y%m%d_%H%M%S_%f}_{uuid.uuid4().hex[:6]}"
+    tmp_db = os.path.join(root, f"snapshot_{snapshot_id}.db")
+    backup_to(tmp_db, progress=progress)
+    try:
+        full_hash = hashlib.sha256()
+        pages = []
+        seen = set()
+        new_pages = 0
+        stored_bytes = 0
+        with open(tmp_db, "rb") as f:
+            header = f.read(100)
+            page_size = _page_size(header)
+            f.seek(0)
+            while True:
+                page = f.read(page_size)
+                if not page:
+                    break
+                full_hash.update(page)
+                digest = hashlib.sha256(page).hexdigest()
+                pages.append(digest)
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                path = _object_path(root, digest)
+                if not _touch(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    data = zlib.compress(page, 6)
+                    _write_atomic(path, data)
+                    new_pages += 1
+                    stored_bytes += len(data)
+    finally:
+        os.remove(tmp_db)
+
+    sha256 = full_hash.hexdigest()
+    if snapshots and snapshots[-1]["sha256"] == sha256:
+        return {"skipped": True, "id": snapshots[-1]["id"], "new_pages": 0, "stored_bytes": 0, "pruned": []}
+
+    manifest = {
+        "id": snapshot_id,
+        "created": now.isoformat(timespec="seconds"),
+        "page_size": page_size,
+        "sha256": sha256,
+        "source": source,
+        "change_seq": change_seq,
+        "pages": pages,
+    }
+    _write_atomic(
+        os.path.join(root, "snapshots", f"{snapshot_id}.json"),
+        json.dumps(manifest).encode("utf-8"),
+    )
+    pruned = prune(root, now=now)
+    return {
+        "skipped": False,
+        "id": snapshot_id,
+        "new_pages": new_pages,
+        "total_pages": len(pages),
+        "stored_bytes": stored_bytes,
+        "pruned": pruned,
+    }
+
+def _retained_ids(snapshots, now):
+    keep = set()
+    if snapshots:
+        keep.add(snapshots[-1]["id"])
+    buckets = (
+        (KEEP_DAILY, lambda d: d.date()),
+        (KEEP_WEEKLY, lambda d: d.isocalendar()[:2]),
+        (KEEP_MONTHLY, lambda d: (d.year, d.month)),
+    )
+    for limit, bucket_of in buckets:
+        seen = []
+        for snap in reversed(snapshots):
+            bucket = bucket_of(datetime.fromisoformat(snap["created"]))
+            if bucket in seen:
+                continue
+            if len(seen) >= limit:
+                break
+            seen.append(bucket)
+            keep.add(snap["id"])
+    return keep
+
+def prune(root=None, now=None, grace_seconds=OBJECT_GRACE_SECONDS):
+    # Drops snapshots outside the retention policy, then any page objects
+    # (and stale .part files) no remaining snapshot references and nobody
+    # touched within grace_seconds. Returns the removed snapshot ids.
+    root = root or default_root()
+    snapshots = list_snapshots(root)
+    keep = _retained_ids(snapshots, now or datetime.now())
+    removed = []
+    for snap in snapshots:
+        if snap["id"] not in keep:
+            try:
+                os.remove(os.path.join(root, "snapshots", f"{snap['id']}.json"))
+            except FileNotFoundError:
+                pass
+            removed.append(snap["id"])
+    if removed:
+        referenced = set()
+        for snap in snapshots:
+            if snap["id"] in keep:
+                referenced.update(snap["pages"])
+        cutoff = time.time() - grace_seconds
+        objects_dir = os.path.join(root, "objects")
+        for sub in os.listdir(objects_dir):
+            for name in os.listdir(os.path.join(objects_dir, sub)):
+                if name in referenced:
+                    continue
+                path = os.path.join(objects_dir, sub, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except FileNotFoundError:
+                    pass
+    return removed
+
+def restore_snapshot(snapshot_id, dest_path, root=None):
+    # Rebuilds the database file of a snapshot at dest_path, verifying its hash.
+    root = root or default_root()
+    with open(os.path.join(root, "snapshots", f"{snapshot_id}.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    full_hash = hashlib.sha256()
+    tmp_path = dest_path + ".part"
+    with open(tmp_path, "wb") as out:
+        for digest in manifest["pages"]:
+            with open(_object_path(root, digest), "rb") as f:
+                page = zlib.decompress(f.read())
+            full_hash.update(page)
+            out.write(page)
+    if full_hash.hexdigest() != manifest["sha256"]:
+        os.remove(tmp_path)
+        raise ValueError(f"Snapshot {snapshot_id} is corrupt (hash mismatch)")
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspection DB snapshot store")
+    parser.add_argument("--root", default=None, help="snapshot store directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    restore = sub.add_parser("restore")
+    restore.add_argument("snapshot_id")
+    restore.add_argument("dest")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for snap in list_snapshots(args.root):
+            print(f"{snap['id']}  {snap['created']}  {len(snap['pages'])} pages")
+    else:
+        print(restore_snapshot(args.snapshot_id, args.dest, args.root))
@@ -0,0 +1,80 @@
+# components.py
+import flet as ft
+
+from status import STATUS_LABELS, EXPIRED, DUE_SOON, OK, NO_DATA
+
+# Status -> (text color, row background).
+STATUS_COLORS = {
+    EXPIRED: (ft.Colors.RED_700, ft.Colors.RED_50),
+    DUE_SOON: (ft.Colors.ORANGE_700, ft.Colors.ORANGE_50),
+    OK: (ft.Colors.GREEN_700, ft.Colors.GREEN_50),
+    NO_DATA: (ft.Colors.GREY_700, ft.Colors.GREY_100),
+}
+
+
+def _action_button(icon, color, label, on_click):
+    return ft.TextButton(
+        content=ft.Row([ft.Icon(icon, color=color, size=18), ft.Text(label, size=12)]),
+        on_click=on_click,
+    )
+
+
+class CompanyRow:
+    # One dashboard DataRow bound to a company id. Its controls and click
+    # handlers are created once; update() only assigns values that changed
+    # so re-renders allocate nothing and the Flet diff stays small.
+    # `actions` maps "edit" / "history" / "delete" to callbacks taking the id.
+
+    __slots__ = ("cid", "actions", "name", "done", "next", "status", "boxes", "row")
+
+    def __init__(self, cid, actions, widths):
+        self.cid = cid
+        self.actions = actions
+        self.name = ft.Text("", weight=ft.FontWeight.W_500)
+        self.done = ft.Text("")
+        self.next = ft.Text("")
+        self.status = ft.Text("", weight=ft.FontWeight.BOLD)
+        buttons = ft.Row(
+            [
+                _action_button(ft.Icons.EDIT, ft.Colors.BLUE, "編集 | Edit", self._on_edit),
+                _action_button(ft.Icons.HISTORY, ft.Colors.GREY_700, "履歴 | History", self._on_history),
+                _action_button(ft.Icons.DELETE, ft.Colors.RED, "削除 | Delete", self._on_delete),
+            ],
+            spacing=8,
+        )
+        self.boxes = [
+            ft.Container(ctrl, width=w)
+            for ctrl, w in zip((self.name, self.done, self.next, self.status, buttons), widths)
+        ]
+        self.row = ft.DataRow(cells=[ft.DataCell(b) for b in self.boxes])
+
+    def _on_edit(self, e):
+        self.actions["edit"](self.cid)
+
+    def _on_history(self, e):
+        self.actions["history"](self.cid)
+
+    def _on_delete(self, e):
+        self.actions["delete"](self.cid)
+
+    def update(self, c, status):
+        status_color, row_bg = STATUS_COLORS[status]
+        values = (
+            (self.name, c["name"]),
+            (self.done, c["done"] if c["done"] else "-"),
+            (self.next, c["next"] if c["next"] else "-"),
+            (self.status, STATUS_LABELS[status]),
+        )
+        for ctrl, value in values:
+            if ctrl.value != value:
+                ctrl.value = value
+        if self.status.color != status_color:
+            self.status.color = status_color
+        if self.row.color != row_bg:
+            self.row.color = row_bg
+
+    def set_widths(self, widths):
+        # Column relayout only; no values are touched.
+        for box, w in zip(self.boxes, widths):
+            if box.width != w:
+                box.width = w
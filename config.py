@@ -0,0 +1,93 @@
+# config.py
+#
+# config.json under %APPDATA%\AnnualInspectionSystem, shared by db.py and
+# app.py. Loaded once and cached; get() re-reads only when the file's
+# mtime/size changed (another instance or a hand edit). set()/update()
+# write only when a value actually changes, merged onto the freshest file
+# contents, through a temp file + os.replace so readers never see a
+# half-written file.
+import json
+import os
+import threading
+
+CONFIG_DIR = os.path.join(os.getenv("APPDATA") or os.path.expanduser("~"), "AnnualInspectionSystem")
+CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
+
+
+class ConfigService:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._data = {}
+        self._signature = None
+        self._loaded = False
+        self.loads = 0
+        self.writes = 0
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _refresh(self):
+        signature = self._stat()
+        if self._loaded and signature == self._signature:
+            return
+        data = {}
+        if signature is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    loaded = json.load(f)
+                if isinstance(loaded, dict):
+                    data = loaded
+            except (OSError, ValueError):
+                pass
+        self._data = data
+        self._signature = signature
+        self._loaded = True
+        self.loads += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._refresh()
+            return self._data.get(key, default)
+
+    def snapshot(self):
+        with self._lock:
+            self._refresh()
+            return dict(self._data)
+
+    def set(self, key, value):
+        return self.update({key: value})
+
+    def update(self, values):
+        # Returns True when the file was written. Raises OSError if it can't be.
+        with self._lock:
+            self._refresh()
+            if all(key in self._data and self._data[key] == value for key, value in values.items()):
+                return False
+            data = dict(self._data)
+            data.update(values)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._data = data
+            self._signature = self._stat()
+            self.writes += 1
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {"loads": self.loads, "writes": self.writes}
+
+
+config = ConfigService(CONFIG_PATH)
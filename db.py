@@ -1,164 +1,954 @@
 # db.py
 import sqlite3
 import os
-import json
+import time
+import atexit
+import threading
+import functools
+import random
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+from config import CONFIG_DIR, CONFIG_PATH, config
+from search_index import normalize
+from status import STATUS_LABELS, EXPIRED, DUE_SOON, OK, NO_DATA
 
 DEFAULT_DATA_DIR = os.path.join(os.getenv("APPDATA") or os.path.expanduser("~"), "AnnualInspectionSystem", "data")
-CONFIG_DIR = os.path.join(os.getenv("APPDATA") or os.path.expanduser("~"), "AnnualInspectionSystem")
-CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
 
-def _can_use_dir(path):
+def _dir_error(path):
+    # None when the folder can be created and written to, else the reason.
     try:
         os.makedirs(path, exist_ok=True)
         test_file = os.path.join(path, ".write_test")
         with open(test_file, "w", encoding="utf-8") as f:
             f.write("ok")
         os.remove(test_file)
-        return True
-    except Exception:
-        return False
+        return None
+    except Exception as e:
+        return str(e)
 
 def _save_data_dir_to_config(path):
     try:
-        existing = {}
-        if os.path.exists(CONFIG_PATH):
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                loaded = json.load(f)
-                if isinstance(loaded, dict):
-                    existing = loaded
-        existing["data_dir"] = path
-        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-            json.dump(existing, f, ensure_ascii=False, indent=2)
-    except Exception:
+        config.set("data_dir", path)
+    except OSError:
         pass
 
 def _load_data_dir():
+    # Returns (data_dir, error). This is the only writability probe at
+    # startup; the app shows `error` instead of probing the share again.
     os.makedirs(CONFIG_DIR, exist_ok=True)
     config_data_dir = None
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            val = data.get("data_dir")
-            if isinstance(val, str) and val.strip():
-                config_data_dir = val.strip()
-        except Exception:
-            pass
+    val = config.get("data_dir")
+    if isinstance(val, str) and val.strip():
+        config_data_dir = val.strip()
 
     default_dir = os.environ.get("ANNUAL_INSPECTION_DATA_DIR", DEFAULT_DATA_DIR)
 
-    # 1) Use configured data_dir if it is writable.
-    if config_data_dir and _can_use_dir(config_data_dir):
-        return config_data_dir
+    # 1) Use configured data_dir if it is writable. A replica keeps syncing
+    #    to the configured share even while it is unreachable.
+    if config_data_dir and config.get("replica"):
+        return config_data_dir, None
+    error = _dir_error(config_data_dir) if config_data_dir else None
+    if config_data_dir and error is None:
+        return config_data_dir, None
 
     # 2) Otherwise, fall back to local default and persist it.
-    if _can_use_dir(default_dir):
+    default_error = _dir_error(default_dir)
+    if default_error is None:
         _save_data_dir_to_config(default_dir)
-        return default_dir
+        return default_dir, None
 
     # 3) Last resort: return whatever was configured (or default) and fail later with explicit UI message.
-    return config_data_dir or default_dir
+    return config_data_dir or default_dir, error or default_error
 
-DATA_DIR = _load_data_dir()
+DATA_DIR, DATA_DIR_ERROR = _load_data_dir()
 DB_NAME = os.path.join(DATA_DIR, "inspection.db")
 
+# Offline-first mode ("replica": true in config.json): reads and writes go
+# to a local copy under %APPDATA% that replica.py syncs with DB_NAME.
+REPLICA_MODE = bool(config.get("replica"))
+REPLICA_DIR = os.path.join(CONFIG_DIR, "replica")
+REPLICA_DB = os.path.join(REPLICA_DIR, "inspection.db")
+
 def get_data_dir():
     return DATA_DIR
 
+def get_data_dir_error():
+    return DATA_DIR_ERROR
+
 def get_config_path():
     return CONFIG_PATH
 
-def get_connection():
-    os.makedirs(DATA_DIR, exist_ok=True)
-    conn = sqlite3.connect(DB_NAME)
-    conn.execute("PRAGMA foreign_keys = ON")
+# ── Journaling / locking strategy ────────────────────────────────
+# config.json keys:
+#   "journal_mode": "auto" (default) | "wal" | "delete" | "truncate"
+#   "busy_timeout_ms": how long a connection waits on a lock before erroring
+# WAL needs shared memory between readers and writers, which network
+# filesystems (SMB/NFS) do not provide. The mode is stored in the database
+# file, and the machine hosting the share sees the folder as a local disk,
+# so "auto" never puts the shared DB in WAL: only the local replica uses it.
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+WRITE_RETRIES = 5
+_JOURNAL_MODES = ("wal", "delete", "truncate", "persist")
+_lock_retries = 0
+
+def _is_network_path(path):
+    path = os.path.abspath(path)
+    if path.startswith("\\\\") or path.startswith("//"):
+        return True
+    if os.name == "nt":
+        try:
+            import ctypes
+            drive = os.path.splitdrive(path)[0] + "\\"
+            return ctypes.windll.kernel32.GetDriveTypeW(drive) == 4  # DRIVE_REMOTE
+        except Exception:
+            return False
+    try:
+        best, fstype = "", ""
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) > 2 and path.startswith(parts[1]) and len(parts[1]) > len(best):
+                    best, fstype = parts[1], parts[2]
+        return fstype.startswith(("nfs", "cifs", "smb"))
+    except Exception:
+        return False
+
+def _resolve_journal_mode(requested, db_path):
+    if requested in _JOURNAL_MODES:
+        return requested
+    if os.path.abspath(db_path) != os.path.abspath(REPLICA_DB):
+        return "delete"
+    return "delete" if _is_network_path(os.path.dirname(db_path)) else "wal"
+
+def _connect(path, busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS):
+    conn = sqlite3.connect(path, timeout=busy_timeout_ms / 1000, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
     return conn
 
+# One long-lived connection shared by every DB call (pragmas applied once).
+# Access is serialized with a re-entrant lock so Flet handler threads can share it.
+class ConnectionManager:
+    def __init__(self, path, journal_mode="auto", busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS):
+        self.path = path
+        self.requested_journal_mode = journal_mode
+        self.busy_timeout_ms = busy_timeout_ms
+        self.journal_mode = None
+        self._conn = None
+        self._lock = threading.RLock()
+        self.opened = 0
+        self.reused = 0
+        self.closed = 0
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = _connect(self.path, self.busy_timeout_ms)
+        conn.execute("PRAGMA foreign_keys = ON")
+        mode = _resolve_journal_mode(self.requested_journal_mode, self.path)
+        try:
+            self.journal_mode = conn.execute(f"PRAGMA journal_mode = {mode}").fetchone()[0].lower()
+        except sqlite3.OperationalError as e:
+            if not _is_locked_error(e):
+                raise
+            # Leaving WAL needs the database to itself. Another instance has
+            # it open: keep its mode, a later lone opener switches it back.
+            self.journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0].lower()
+        if self.journal_mode == "wal":
+            conn.execute("PRAGMA synchronous = NORMAL")
+        self.opened += 1
+        return conn
+
+    def open(self):
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._open()
+            return self._conn
+
+    @contextmanager
+    def connection(self):
+        # Commits on success and rolls back on error, like `with sqlite3.connect(...)`.
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._open()
+            else:
+                self.reused += 1
+            with self._conn:
+                yield self._conn
+
+    @contextmanager
+    def write_transaction(self):
+        # BEGIN IMMEDIATE takes the database write lock up front, so a writer
+        # waits (busy_timeout) at the start instead of failing mid-transaction
+        # when another instance on the share is writing.
+        with self._lock:
+            if self._conn is None:
+                self._conn = self._open()
+            else:
+                self.reused += 1
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                # Inside the try: with DELETE journaling COMMIT waits for an
+                # exclusive lock, and a timeout there must not leave the
+                # shared connection in an open transaction.
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                self.closed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "opened": self.opened,
+                "reused": self.reused,
+                "closed": self.closed,
+                "is_open": self._conn is not None,
+                "journal_mode": self.journal_mode,
+                "lock_retries": _lock_retries,
+            }
+
+_manager = ConnectionManager(
+    REPLICA_DB if REPLICA_MODE else DB_NAME,
+    journal_mode=str(config.get("journal_mode", "auto")).lower(),
+    busy_timeout_ms=int(config.get("busy_timeout_ms", DEFAULT_BUSY_TIMEOUT_MS)),
+)
+atexit.register(_manager.close)
+
+def connection_manager(path):
+    # A separate manager for another database file (replica sync), with the
+    # same journaling and busy timeout settings as the main one.
+    return ConnectionManager(
+        path,
+        journal_mode=_manager.requested_journal_mode,
+        busy_timeout_ms=_manager.busy_timeout_ms,
+    )
+
+def get_connection():
+    return _manager.connection()
+
+def get_db_path():
+    # The database reads and writes go to: the shared DB, or the local replica.
+    return _manager.path
+
+def write_transaction():
+    return _manager.write_transaction()
+
+def _is_locked_error(e):
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+def _retry_locked(fn):
+    # Retries a whole write (its transaction was rolled back) with
+    # exponential backoff when busy_timeout elapsed under contention.
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        global _lock_retries
+        delay = 0.05
+        for attempt in range(WRITE_RETRIES):
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if not _is_locked_error(e) or attempt == WRITE_RETRIES - 1:
+                    raise
+            _lock_retries += 1
+            time.sleep(delay + random.uniform(0, delay))
+            delay = min(delay * 2, 2.0)
+    return wrapper
+
+def get_connection_stats():
+    return _manager.stats()
+
+def close_db():
+    _manager.close()
+
+def backup_to(dest_path, progress=None, pages=256):
+    # Online backup through the SQLite backup API: copies `pages` pages per
+    # step so writers are not blocked for the whole copy, and restarts
+    # automatically if another connection writes mid-copy, so the result is
+    # always a consistent snapshot. progress(copied, total) is called per step.
+    tmp_path = dest_path + ".part"
+    src = _connect(_manager.path, _manager.busy_timeout_ms)
+    try:
+        dst = sqlite3.connect(tmp_path)
+        try:
+            def on_step(status, remaining, total):
+                if progress is not None:
+                    progress(total - remaining, total)
+            src.backup(dst, pages=pages, progress=on_step)
+        finally:
+            dst.close()
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        src.close()
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+# Bump whenever init_schema() gains a migration.
+#   2: latest_inspections ranks by done date instead of by id alone
+#   3: ... then by updated_at and uuid instead of the local id
+#   4: latest_inspections ranks by the last save (updated_at) first
+SCHEMA_VERSION = 4
+CHANGE_LOG_RETENTION_DAYS = 90
+_UUID_SQL = "lower(hex(randomblob(16)))"
+_NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+@_retry_locked
 def init_db():
+    _manager.open()
     with get_connection() as conn:
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS companies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                done_date TEXT,
-                next_date TEXT
-            )
+        init_schema(conn)
+
+def init_schema(conn):
+    # Creates/migrates the schema on any connection (the shared DB or a local replica).
+    # PRAGMA user_version records the schema version, so an up-to-date
+    # database skips the migrations below with a single read.
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        _prune_change_log(conn)
+        return
+    # Migrate in one write transaction (committed by the caller's `with
+    # conn`): another instance upgrading the same share waits here and then
+    # sees the new version, and readers never see latest_inspections
+    # half rebuilt.
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS companies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            done_date TEXT,
+            next_date TEXT
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inspections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            company_id INTEGER NOT NULL,
+            done_date TEXT,
+            next_date TEXT,
+            notes TEXT,
+            FOREIGN KEY(company_id) REFERENCES companies(id) ON DELETE CASCADE
+        )
+    """)
+
+    #  PERFORMANCE INDEXES (paste here)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_companies_name ON companies(name)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_companies_next ON companies(next_date)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_inspections_company_date ON inspections(company_id, done_date)"
+    )
+
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_companies_name_nocase ON companies(name COLLATE NOCASE)"
+    )
+
+    # Stable row identity for replica sync (replica.py): a uuid per company
+    # and inspection, plus updated_at for last-writer-wins. The AFTER INSERT
+    # fallback covers writers that do not supply them (older app versions).
+    # Added before latest_inspections, whose ranking reads both columns.
+    for table in ("companies", "inspections"):
+        cols = {r[1] for r in conn.execute(f"PRAGMA table_info({table})")}
+        for col in ("uuid", "updated_at"):
+            if col not in cols:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} TEXT")
+        conn.execute(f"UPDATE {table} SET uuid = {_UUID_SQL} WHERE uuid IS NULL")
+        conn.execute(f"UPDATE {table} SET updated_at = {_NOW_SQL} WHERE updated_at IS NULL")
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_uuid ON {table}(uuid)")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_uuid
+            AFTER INSERT ON {table}
+            WHEN NEW.uuid IS NULL
+            BEGIN
+                UPDATE {table}
+                SET uuid = {_UUID_SQL}, updated_at = COALESCE(NEW.updated_at, {_NOW_SQL})
+                WHERE id = NEW.id;
+            END
         """)
 
+    # Denormalized latest inspection per company, kept in sync by triggers
+    # so the dashboard does not probe inspections once per company.
+    # next_jd / warn_jd are julian days of next_date and of its warning
+    # start (1st of the month two months earlier) for indexed status queries.
+    latest_cols = {r[1] for r in conn.execute("PRAGMA table_info(latest_inspections)")}
+    rebuild_latest = "warn_jd" not in latest_cols or version < 4
+    if latest_cols and rebuild_latest:
+        # Older projection (no julian day columns, or latest ranked by local
+        # ids): it is derived data, so drop it and its triggers and rebuild
+        # from inspections.
+        for trigger in _LATEST_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute("DROP TABLE latest_inspections")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS latest_inspections (
+            company_id INTEGER PRIMARY KEY,
+            inspection_id INTEGER NOT NULL,
+            done_date TEXT,
+            next_date TEXT,
+            notes TEXT,
+            next_jd REAL,
+            warn_jd REAL,
+            FOREIGN KEY(company_id) REFERENCES companies(id) ON DELETE CASCADE
+        )
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_latest_next_jd ON latest_inspections(next_jd)"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_latest_warn_jd ON latest_inspections(warn_jd)"
+    )
+    _create_latest_triggers(conn)
+
+    cur = conn.execute("SELECT COUNT(*) FROM inspections")
+    if cur.fetchone()[0] == 0:
         conn.execute("""
-            CREATE TABLE IF NOT EXISTS inspections (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                company_id INTEGER NOT NULL,
-                done_date TEXT,
-                next_date TEXT,
-                notes TEXT,
-                FOREIGN KEY(company_id) REFERENCES companies(id) ON DELETE CASCADE
-            )
+            INSERT INTO inspections (company_id, done_date, next_date, notes)
+            SELECT id, done_date, next_date, ''
+            FROM companies
+            WHERE done_date IS NOT NULL OR next_date IS NOT NULL
         """)
 
-        #  PERFORMANCE INDEXES (paste here)
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_companies_name ON companies(name)"
+    if rebuild_latest:
+        _rebuild_latest(conn)
+
+    # Append-only change log filled by triggers, so consumers (live
+    # refresh, exports, backups) can ask what changed since a sequence.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            company_id INTEGER,
+            op TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+            company_uuid TEXT
         )
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_companies_next ON companies(next_date)"
+    """)
+    if "company_uuid" not in {r[1] for r in conn.execute("PRAGMA table_info(change_log)")}:
+        conn.execute("ALTER TABLE change_log ADD COLUMN company_uuid TEXT")
+        for table in ("companies", "inspections"):
+            for op in ("insert", "update", "delete"):
+                conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_log_{op}")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_change_log_company ON change_log(company_id, seq)"
+    )
+    _create_change_log_triggers(conn)
+    _prune_change_log(conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def _prune_change_log(conn):
+    # Checks the oldest entry first so a start with nothing to prune stays
+    # read-only (a no-op DELETE would still take the write lock on the share).
+    cutoff = conn.execute(
+        "SELECT strftime('%Y-%m-%dT%H:%M:%fZ', 'now', ?)", (f"-{CHANGE_LOG_RETENTION_DAYS} days",)
+    ).fetchone()[0]
+    oldest = conn.execute("SELECT changed_at FROM change_log ORDER BY seq LIMIT 1").fetchone()
+    if oldest is not None and oldest[0] < cutoff:
+        conn.execute("DELETE FROM change_log WHERE changed_at < ?", (cutoff,))
+
+def _create_change_log_triggers(conn):
+    sources = (
+        ("companies", "id", "{row}.uuid"),
+        ("inspections", "company_id", "(SELECT uuid FROM companies WHERE id = {row}.company_id)"),
+    )
+    events = (
+        ("insert", "INSERT", "NEW"),
+        ("update", "UPDATE", "NEW"),
+        ("delete", "DELETE", "OLD"),
+    )
+    for table, company_col, company_uuid in sources:
+        for op, event, row in events:
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_log_{op}
+                AFTER {event} ON {table}
+                BEGIN
+                    INSERT INTO change_log (table_name, row_id, company_id, op, company_uuid)
+                    VALUES ('{table}', {row}.id, {row}.{company_col}, '{op}', {company_uuid.format(row=row)});
+                END
+            """)
+
+
+_LATEST_TRIGGERS = (
+    "trg_inspections_latest_insert",
+    "trg_inspections_latest_update",
+    "trg_inspections_latest_delete",
+)
+
+_LATEST_COLUMNS = "company_id, inspection_id, done_date, next_date, notes, next_jd, warn_jd"
+
+def _latest_values(a):
+    # Column values for latest_inspections taken from inspections row/alias `a`.
+    return (
+        f"{a}.company_id, {a}.id, {a}.done_date, {a}.next_date, {a}.notes, "
+        f"julianday({a}.next_date), julianday({a}.next_date, 'start of month', '-2 months')"
+    )
+
+def _latest_key(a):
+    # Sort key of inspections row/alias `a` for "latest": the last save wins,
+    # so correcting a mistyped date from the form takes effect. Rows stamped
+    # together (the uuid/updated_at migration) fall back to the newest done
+    # date, then the uuid. Only values every copy shares: AUTOINCREMENT ids
+    # differ between the shared DB and each replica. import_records() stamps
+    # older history so it cannot outrank what is already on file.
+    return (
+        f"COALESCE({a}.updated_at, '')",
+        f"COALESCE({a}.done_date, '')",
+        f"COALESCE({a}.uuid, '')",
+    )
+
+def _latest_order(a):
+    return ", ".join(f"{col} DESC" for col in _latest_key(a))
+
+def _ranks_above(a, b):
+    return f"({', '.join(_latest_key(a))}) > ({', '.join(_latest_key(b))})"
+
+def _latest_ids(company_ids):
+    # Subquery: the latest inspection id of each company in `company_ids`.
+    return f"""
+        SELECT (
+            SELECT x.id FROM inspections x
+            WHERE x.company_id = c.company_id
+            ORDER BY {_latest_order("x")}
+            LIMIT 1
         )
-        conn.execute(
-            "CREATE INDEX IF NOT EXISTS idx_inspections_company_date ON inspections(company_id, done_date)"
+        FROM ({company_ids}) c
+    """
+
+def _create_latest_triggers(conn):
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_inspections_latest_insert
+        AFTER INSERT ON inspections
+        WHEN NOT EXISTS (
+            SELECT 1 FROM latest_inspections l
+            JOIN inspections i ON i.id = l.inspection_id
+            WHERE l.company_id = NEW.company_id AND {_ranks_above("i", "NEW")}
         )
+        BEGIN
+            INSERT OR REPLACE INTO latest_inspections ({_LATEST_COLUMNS})
+            VALUES ({_latest_values("NEW")});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_inspections_latest_update
+        AFTER UPDATE ON inspections
+        WHEN OLD.id = (SELECT inspection_id FROM latest_inspections WHERE company_id = OLD.company_id)
+            OR NOT EXISTS (
+                SELECT 1 FROM latest_inspections l
+                JOIN inspections i ON i.id = l.inspection_id
+                WHERE l.company_id = NEW.company_id AND {_ranks_above("i", "NEW")}
+            )
+        BEGIN
+            DELETE FROM latest_inspections WHERE company_id IN (OLD.company_id, NEW.company_id);
+            INSERT INTO latest_inspections ({_LATEST_COLUMNS})
+            SELECT {_latest_values("i")}
+            FROM inspections i
+            WHERE i.id IN ({_latest_ids("SELECT OLD.company_id AS company_id UNION SELECT NEW.company_id")});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_inspections_latest_delete
+        AFTER DELETE ON inspections
+        WHEN OLD.id = (SELECT inspection_id FROM latest_inspections WHERE company_id = OLD.company_id)
+        BEGIN
+            DELETE FROM latest_inspections WHERE company_id = OLD.company_id;
+            INSERT INTO latest_inspections ({_LATEST_COLUMNS})
+            SELECT {_latest_values("i")}
+            FROM inspections i
+            WHERE i.company_id = OLD.company_id
+            ORDER BY {_latest_order("i")}
+            LIMIT 1;
+        END
+    """)
 
-        cur = conn.execute("SELECT COUNT(*) FROM inspections")
-        if cur.fetchone()[0] == 0:
-            conn.execute("""
-                INSERT INTO inspections (company_id, done_date, next_date, notes)
-                SELECT id, done_date, next_date, ''
-                FROM companies
-                WHERE done_date IS NOT NULL OR next_date IS NOT NULL
-            """)
+def _rebuild_latest(conn):
+    conn.execute("DELETE FROM latest_inspections")
+    conn.execute(f"""
+        INSERT INTO latest_inspections ({_LATEST_COLUMNS})
+        SELECT {_latest_values("i")}
+        FROM inspections i
+        WHERE i.id IN ({_latest_ids("SELECT DISTINCT company_id FROM inspections")})
+    """)
 
 
 def load_companies():
     with get_connection() as conn:
         cur = conn.execute("""
-            SELECT c.id, c.name, i.done_date, i.next_date, i.notes
+            SELECT c.id, c.name, l.done_date, l.next_date, l.notes, l.inspection_id
             FROM companies c
-            LEFT JOIN inspections i
-            ON i.id = (
-                SELECT id
-                FROM inspections
-                WHERE company_id = c.id
-                ORDER BY id DESC
-                LIMIT 1
-            )
+            LEFT JOIN latest_inspections l ON l.company_id = c.id
             ORDER BY c.name COLLATE NOCASE
         """)
+        return [
+            {"id": r[0], "name": r[1], "done": r[2], "next": r[3], "notes": r[4], "inspection_id": r[5]}
+            for r in cur.fetchall()
+        ]
+
+def load_companies_by_ids(ids):
+    ids = list(ids)
+    rows = []
+    with get_connection() as conn:
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            cur = conn.execute(f"""
+                SELECT c.id, c.name, l.done_date, l.next_date, l.notes, l.inspection_id
+                FROM companies c
+                LEFT JOIN latest_inspections l ON l.company_id = c.id
+                WHERE c.id IN ({",".join("?" * len(chunk))})
+            """, chunk)
+            rows.extend(
+                {"id": r[0], "name": r[1], "done": r[2], "next": r[3], "notes": r[4], "inspection_id": r[5]}
+                for r in cur.fetchall()
+            )
+    return rows
+
+def latest_change_seq():
+    with get_connection() as conn:
+        return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+
+def changes_since(seq, limit=None):
+    # Change log entries after `seq`, oldest first.
+    with get_connection() as conn:
+        cur = conn.execute("""
+            SELECT seq, table_name, row_id, company_id, op, changed_at
+            FROM change_log
+            WHERE seq > ?
+            ORDER BY seq
+            LIMIT ?
+        """, (seq, -1 if limit is None else limit))
+        return [
+            {"seq": r[0], "table": r[1], "row_id": r[2], "company_id": r[3], "op": r[4], "changed_at": r[5]}
+            for r in cur.fetchall()
+        ]
+
+def changed_companies_since(seq):
+    # (newest seq, ids of companies touched after `seq`).
+    with get_connection() as conn:
+        cur = conn.execute(
+            "SELECT MAX(seq), company_id FROM change_log WHERE seq > ? GROUP BY company_id",
+            (seq,),
+        )
+        rows = cur.fetchall()
+    if not rows:
+        return seq, set()
+    return max(r[0] for r in rows), {r[1] for r in rows}
+
+def data_version():
+    # Changes whenever another connection (another app instance) commits.
+    with get_connection() as conn:
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+def _status_case(next_jd, warn_jd):
+    # Status of a row relative to the :today parameter, as status.py codes.
+    return f"""
+        CASE
+            WHEN {next_jd} IS NULL THEN '{NO_DATA}'
+            WHEN {next_jd} < julianday(:today) THEN '{EXPIRED}'
+            WHEN {warn_jd} <= julianday(:today) THEN '{DUE_SOON}'
+            ELSE '{OK}'
+        END
+    """
+
+_STATUS_FILTERS = {
+    EXPIRED: "l.next_jd < julianday(:today)",
+    DUE_SOON: "l.next_jd >= julianday(:today) AND l.warn_jd <= julianday(:today)",
+    OK: "l.warn_jd > julianday(:today)",
+    NO_DATA: "l.next_jd IS NULL",
+}
+
+def _today_param(today):
+    return (today or date.today()).isoformat()
+
+def count_by_status(today=None):
+    counts = dict.fromkeys(STATUS_LABELS, 0)
+    with get_connection() as conn:
+        cur = conn.execute(f"""
+            SELECT {_status_case('l.next_jd', 'l.warn_jd')} AS status, COUNT(*)
+            FROM companies c
+            LEFT JOIN latest_inspections l ON l.company_id = c.id
+            GROUP BY status
+        """, {"today": _today_param(today)})
+        counts.update(cur.fetchall())
+    return counts
+
+def load_by_status(status, today=None):
+    with get_connection() as conn:
+        cur = conn.execute(f"""
+            SELECT c.id, c.name, l.done_date, l.next_date, l.notes
+            FROM companies c
+            LEFT JOIN latest_inspections l ON l.company_id = c.id
+            WHERE {_STATUS_FILTERS[status]}
+            ORDER BY l.next_jd, c.name COLLATE NOCASE
+        """, {"today": _today_param(today)})
         return [
             {"id": r[0], "name": r[1], "done": r[2], "next": r[3], "notes": r[4]}
             for r in cur.fetchall()
         ]
 
-def add_company(name):
+def load_due_between(start, end):
+    # Companies whose latest next_date falls within [start, end] (dates or ISO strings).
     with get_connection() as conn:
+        cur = conn.execute("""
+            SELECT c.id, c.name, l.done_date, l.next_date, l.notes
+            FROM latest_inspections l
+            JOIN companies c ON c.id = l.company_id
+            WHERE l.next_jd BETWEEN julianday(?) AND julianday(?)
+            ORDER BY l.next_jd, c.name COLLATE NOCASE
+        """, (str(start), str(end)))
+        return [
+            {"id": r[0], "name": r[1], "done": r[2], "next": r[3], "notes": r[4]}
+            for r in cur.fetchall()
+        ]
+
+def _export_query(history, where):
+    if not history:
+        # Latest inspection per company, as shown on the dashboard.
+        return f"""
+            SELECT c.name, l.done_date, l.next_date, {_status_case("l.next_jd", "l.warn_jd")}, l.notes
+            FROM companies c
+            LEFT JOIN latest_inspections l ON l.company_id = c.id
+            {where}
+            ORDER BY c.name COLLATE NOCASE
+        """
+    # Every inspection ever recorded, newest first within each company.
+    return f"""
+        SELECT c.name, i.done_date, i.next_date, {_status_case(
+            "julianday(i.next_date)", "julianday(i.next_date, 'start of month', '-2 months')"
+        )}, i.notes
+        FROM companies c
+        LEFT JOIN inspections i ON i.company_id = c.id
+        {where}
+        ORDER BY c.name COLLATE NOCASE, i.done_date DESC, i.id DESC
+    """
+
+def export_csv(dest_path, history=False, compress=False, progress=None, chunk_rows=500, today=None, since_seq=None):
+    # Streams rows from a cursor on a dedicated connection straight into the
+    # CSV (optionally gzip), flushing every chunk_rows rows, so memory stays
+    # bounded and the shared connection is not held. The single SELECT reads
+    # one consistent snapshot. progress(rows_written, total_rows) per chunk.
+    # With since_seq, only companies changed after that change_log seq.
+    import csv  # only needed on export; kept off the startup path
+    import gzip
+    started = time.perf_counter()
+    params = {"today": _today_param(today), "since": since_seq}
+    where = ""
+    if since_seq is not None:
+        where = "WHERE c.id IN (SELECT company_id FROM change_log WHERE seq > :since)"
+    tmp_path = dest_path + ".part"
+    conn = _connect(_manager.path, _manager.busy_timeout_ms)
+    try:
+        join = "LEFT JOIN inspections i ON i.company_id = c.id" if history else ""
+        total = conn.execute(f"SELECT COUNT(*) FROM companies c {join} {where}", params).fetchone()[0]
+        if compress:
+            f = gzip.open(tmp_path, "wt", newline="", encoding="utf-8")
+        else:
+            f = open(tmp_path, "w", newline="", encoding="utf-8")
+        rows = 0
+        with f:
+            writer = csv.writer(f)
+            writer.writerow(["Company", "Last", "Next", "Status", "Notes"])
+            cur = conn.execute(_export_query(history, where), params)
+            while True:
+                chunk = cur.fetchmany(chunk_rows)
+                if not chunk:
+                    break
+                writer.writerows(
+                    (name, done or "", next_ or "", STATUS_LABELS[status], notes or "")
+                    for name, done, next_, status, notes in chunk
+                )
+                f.flush()
+                rows += len(chunk)
+                if progress is not None:
+                    progress(rows, total)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        conn.close()
+    os.replace(tmp_path, dest_path)
+    seconds = time.perf_counter() - started
+    return {
+        "path": dest_path,
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds > 0 else float(rows),
+    }
+
+def _history_stamp(latest_updated_at):
+    # updated_at for imported history no newer than a company's current
+    # latest: one millisecond before that row's, so it ranks just below it.
+    if not latest_updated_at:
+        return ""
+    stamp = datetime.strptime(latest_updated_at, "%Y-%m-%dT%H:%M:%S.%fZ") - timedelta(milliseconds=1)
+    return f"{stamp:%Y-%m-%dT%H:%M:%S}.{stamp.microsecond // 1000:03d}Z"
+
+@_retry_locked
+def import_records(records, progress=None, chunk_rows=500):
+    # Bulk load of importer.parse_csv() records in a single transaction with
+    # batched executemany. Company names are matched width/case-insensitively
+    # against existing companies and each other, and inspections already on
+    # file (same company, done and next date) are skipped, so re-importing an
+    # export is harmless. progress(rows_written, total_rows) per batch.
+    summary = {"companies_added": 0, "companies_matched": 0, "inspections_added": 0, "duplicates_skipped": 0}
+    with write_transaction() as conn:
+        ids = {}
+        for cid, name in conn.execute("SELECT id, name FROM companies ORDER BY id"):
+            ids.setdefault(normalize(name), cid)
+        seq = conn.execute(
+            "SELECT COALESCE(MAX(id), 0), (SELECT seq FROM sqlite_sequence WHERE name = 'companies') FROM companies"
+        ).fetchone()
+        next_id = max(seq[0], seq[1] or 0) + 1
+
+        new_companies = []
+        on_file = set(ids)
+        matched = set()
+        for r in records:
+            key = normalize(r["name"])
+            if key in ids:
+                if key in on_file:
+                    matched.add(key)
+                continue
+            ids[key] = next_id
+            new_companies.append((next_id, r["name"].strip(), "", "", uuid.uuid4().hex))
+            next_id += 1
+
+        existing = set(conn.execute(
+            "SELECT company_id, COALESCE(done_date, ''), COALESCE(next_date, '') FROM inspections"
+        ))
+        # Current latest (done date, updated_at) of every company on file.
+        current = {
+            r[0]: (r[1] or "", r[2])
+            for r in conn.execute("""
+                SELECT l.company_id, l.done_date, i.updated_at
+                FROM latest_inspections l
+                JOIN inspections i ON i.id = l.inspection_id
+            """)
+        }
+        now = conn.execute(f"SELECT {_NOW_SQL}").fetchone()[0]
+        inspections = []
+        # Oldest first, so ids follow done dates; imported rows share one
+        # save time, so the newest done date among them ranks highest.
+        for r in sorted(records, key=lambda r: (r["done"], r["next"])):
+            if not r["done"] and not r["next"]:
+                continue
+            cid = ids[normalize(r["name"])]
+            key = (cid, r["done"], r["next"])
+            if key in existing:
+                summary["duplicates_skipped"] += 1
+                continue
+            existing.add(key)
+            updated_at = now
+            if cid in current and r["done"] <= current[cid][0]:
+                updated_at = _history_stamp(current[cid][1])
+            inspections.append((cid, r["done"], r["next"], r["notes"], uuid.uuid4().hex, updated_at))
+
+        total = len(new_companies) + len(inspections)
+        written = 0
+        batches = (
+            (
+                "INSERT INTO companies (id, name, done_date, next_date, uuid, updated_at) "
+                f"VALUES (?, ?, ?, ?, ?, {_NOW_SQL})",
+                new_companies,
+            ),
+            (
+                "INSERT INTO inspections (company_id, done_date, next_date, notes, uuid, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                inspections,
+            ),
+        )
+        for sql, rows in batches:
+            for i in range(0, len(rows), chunk_rows):
+                chunk = rows[i:i + chunk_rows]
+                conn.executemany(sql, chunk)
+                written += len(chunk)
+                if progress is not None:
+                    progress(written, total)
+
+        summary["companies_added"] = len(new_companies)
+        summary["companies_matched"] = len(matched)
+        summary["inspections_added"] = len(inspections)
+    invalidate_history()
+    return summary
+
+@_retry_locked
+def add_company(name):
+    with write_transaction() as conn:
         cur = conn.execute(
-            "INSERT INTO companies (name, done_date, next_date) VALUES (?, ?, ?)",
-            (name, "", "")
+            f"INSERT INTO companies (name, done_date, next_date, uuid, updated_at) VALUES (?, ?, ?, ?, {_NOW_SQL})",
+            (name, "", "", uuid.uuid4().hex)
         )
         return cur.lastrowid
 
+@_retry_locked
 def update_company(cid, name):
-    with get_connection() as conn:
-        conn.execute("""
+    with write_transaction() as conn:
+        conn.execute(f"""
             UPDATE companies
-            SET name=?
+            SET name=?, updated_at={_NOW_SQL}
             WHERE id=?
         """, (name, cid))
 
+@_retry_locked
 def add_inspection(cid, done_s, next_s, notes):
-    with get_connection() as conn:
+    with write_transaction() as conn:
+        cur = conn.execute(
+            "INSERT INTO inspections (company_id, done_date, next_date, notes, uuid, updated_at) "
+            f"VALUES (?, ?, ?, ?, ?, {_NOW_SQL})",
+            (cid, done_s, next_s, notes, uuid.uuid4().hex)
+        )
+    invalidate_history(cid)
+    return cur.lastrowid
+
+@_retry_locked
+def save_company_with_inspection(cid, name, done_s, next_s, notes):
+    # One save from the form as a single transaction: creates the company
+    # (cid None) or renames it, then records the inspection. Returns the
+    # company row in load_companies() shape for the in-memory view.
+    with write_transaction() as conn:
+        if cid is None:
+            cid = conn.execute(
+                f"INSERT INTO companies (name, done_date, next_date, uuid, updated_at) VALUES (?, ?, ?, ?, {_NOW_SQL})",
+                (name, "", "", uuid.uuid4().hex)
+            ).lastrowid
+        else:
+            conn.execute(
+                f"UPDATE companies SET name=?, updated_at={_NOW_SQL} WHERE id=? AND name IS NOT ?",
+                (name, cid, name)
+            )
         conn.execute(
-            "INSERT INTO inspections (company_id, done_date, next_date, notes) VALUES (?, ?, ?, ?)",
-            (cid, done_s, next_s, notes)
+            "INSERT INTO inspections (company_id, done_date, next_date, notes, uuid, updated_at) "
+            f"VALUES (?, ?, ?, ?, ?, {_NOW_SQL})",
+            (cid, done_s, next_s, notes, uuid.uuid4().hex)
         )
+        r = conn.execute("""
+            SELECT c.id, c.name, l.done_date, l.next_date, l.notes, l.inspection_id
+            FROM companies c
+            LEFT JOIN latest_inspections l ON l.company_id = c.id
+            WHERE c.id = ?
+        """, (cid,)).fetchone()
+    invalidate_history(cid)
+    return {"id": r[0], "name": r[1], "done": r[2], "next": r[3], "notes": r[4], "inspection_id": r[5]}
 
 def load_inspection_history(cid):
     with get_connection() as conn:
@@ -173,7 +963,71 @@ def load_inspection_history(cid):
             for r in cur.fetchall()
         ]
 
-def delete_company(cid):
+# Recently viewed history pages: (cid, cursor, limit) -> (rows, next cursor).
+# Own writes invalidate per company; a PRAGMA data_version bump (another
+# connection committed) drops everything.
+HISTORY_PAGE_SIZE = 50
+HISTORY_CACHE_SIZE = 64
+_history_cache = OrderedDict()
+_history_cache_version = None
+_history_lock = threading.Lock()
+
+def invalidate_history(cid=None):
+    with _history_lock:
+        if cid is None:
+            _history_cache.clear()
+        else:
+            for key in [k for k in _history_cache if k[0] == cid]:
+                del _history_cache[key]
+
+def load_inspection_history_page(cid, after=None, limit=HISTORY_PAGE_SIZE):
+    # Newest first, keyset-paginated on (done_date, id): `after` is the
+    # cursor returned with the previous page, None for the first page.
+    # Returns (rows, next_cursor); next_cursor is None on the last page.
+    global _history_cache_version
+    key = (cid, after, limit)
     with get_connection() as conn:
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        with _history_lock:
+            if version != _history_cache_version:
+                _history_cache.clear()
+                _history_cache_version = version
+            hit = _history_cache.get(key)
+            if hit is not None:
+                _history_cache.move_to_end(key)
+                return hit
+
+        if after is None:
+            where, params = "", ()
+        elif after[0] is None:
+            # NULL done dates sort last; only ids break ties among them.
+            where, params = "AND done_date IS NULL AND id < ?", (after[1],)
+        else:
+            where = "AND (done_date < ? OR done_date IS NULL OR (done_date = ? AND id < ?))"
+            params = (after[0], after[0], after[1])
+        cur = conn.execute(f"""
+            SELECT id, done_date, next_date, notes
+            FROM inspections
+            WHERE company_id=? {where}
+            ORDER BY done_date DESC, id DESC
+            LIMIT ?
+        """, (cid, *params, limit + 1))
+        rows = cur.fetchall()
+
+    cursor = (rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+    result = (
+        [{"id": r[0], "done": r[1], "next": r[2], "notes": r[3]} for r in rows[:limit]],
+        cursor,
+    )
+    with _history_lock:
+        _history_cache[key] = result
+        if len(_history_cache) > HISTORY_CACHE_SIZE:
+            _history_cache.popitem(last=False)
+    return result
+
+@_retry_locked
+def delete_company(cid):
+    with write_transaction() as conn:
         conn.execute("DELETE FROM inspections WHERE company_id=?", (cid,))
         conn.execute("DELETE FROM companies WHERE id=?", (cid,))
+    invalidate_history(cid)
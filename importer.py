@@ -0,0 +1,72 @@
+# importer.py
+#
+# Parses CSVs in the shape export_csv() writes (Company, Last, Next, Status,
+# Notes; one row per company or per inspection when exported with history)
+# into records for db.import_records(). Excel users can "Save As" CSV UTF-8.
+import csv
+import gzip
+from datetime import datetime
+
+from status import calculate_next_date
+
+_HEADERS = {
+    "company": "name",
+    "last": "done",
+    "next": "next",
+    "notes": "notes",
+}
+
+
+def _parse_date(value):
+    value = (value or "").strip()
+    if not value or value == "-":
+        return ""
+    return datetime.strptime(value, "%Y-%m-%d").date().isoformat()
+
+def parse_csv(path):
+    # Returns (records, errors). Each record is {"name", "done", "next", "notes"};
+    # errors are (line_number, message) for rows that were skipped.
+    opener = gzip.open if path.lower().endswith(".gz") else open
+    records = []
+    errors = []
+    # utf-8-sig: Excel prefixes CSV UTF-8 files with a BOM.
+    with opener(path, "rt", newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return records, [(1, "Empty file")]
+        columns = {}
+        for i, title in enumerate(header):
+            key = _HEADERS.get(title.strip().lower())
+            if key:
+                columns[key] = i
+        if "name" not in columns:
+            return records, [(1, "Missing 'Company' column")]
+
+        # reader.line_num counts physical lines, so notes spanning several
+        # lines do not shift the numbers reported for later rows.
+        next_line = reader.line_num + 1
+        for row in reader:
+            line_no, next_line = next_line, reader.line_num + 1
+            if not any(cell.strip() for cell in row):
+                continue
+            values = {key: row[i] if i < len(row) else "" for key, i in columns.items()}
+            name = values["name"].strip()
+            if not name:
+                errors.append((line_no, "Company name is empty"))
+                continue
+            try:
+                done = _parse_date(values.get("done"))
+                next_ = _parse_date(values.get("next"))
+            except ValueError:
+                errors.append((line_no, "Dates must be YYYY-MM-DD"))
+                continue
+            if done and not next_:
+                next_ = calculate_next_date(datetime.strptime(done, "%Y-%m-%d").date()).isoformat()
+            records.append({
+                "name": name,
+                "done": done,
+                "next": next_,
+                "notes": (values.get("notes") or "").strip(),
+            })
+    return records, errors
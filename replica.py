@@ -0,0 +1,335 @@
+# replica.py
+#
+# Offline-first mode ("replica": true in config.json). The app reads and
+# writes a local copy of the database under %APPDATA%; a background worker
+# pushes queued local changes to the shared inspection.db and pulls what
+# other clients changed, so clicks never wait on the network share.
+#
+# Rows are matched across databases by their uuid column. Conflicts are
+# resolved last-writer-wins per row on updated_at; a company deleted on one
+# side is not resurrected by an older edit from the other.
+#
+#   sync_outbox   local-only queue of (table, uuid, op) filled by triggers
+#   sync_state    local-only key/value: last pulled change_log seq, share path
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import db
+from tasks import PeriodicTask
+
+SYNC_INTERVAL_SECONDS = 10
+
+
+def _create_sync_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            uuid TEXT NOT NULL,
+            op TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+    events = (
+        ("insert", "INSERT", "NEW"),
+        ("update", "UPDATE", "NEW"),
+        ("delete", "DELETE", "OLD"),
+    )
+    for table in ("companies", "inspections"):
+        for op, event, row in events:
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_outbox_{op}
+                AFTER {event} ON {table}
+                WHEN {row}.uuid IS NOT NULL
+                BEGIN
+                    INSERT INTO sync_outbox (table_name, uuid, op)
+                    VALUES ('{table}', {row}.uuid, '{op}');
+                END
+            """)
+
+def _get_state(conn, key, default=None):
+    row = conn.execute("SELECT value FROM sync_state WHERE key=?", (key,)).fetchone()
+    return default if row is None else row[0]
+
+def _set_state(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+def _max_seq(conn):
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+
+def _seed(shared):
+    # Copies the shared DB to the replica path through the backup API.
+    tmp_path = db.REPLICA_DB + ".part"
+    dst = sqlite3.connect(tmp_path)
+    try:
+        with shared.connection() as conn:
+            conn.backup(dst)
+    finally:
+        dst.close()
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db.REPLICA_DB + suffix):
+            os.remove(db.REPLICA_DB + suffix)
+    os.replace(tmp_path, db.REPLICA_DB)
+
+def prepare():
+    # Run before db.init_db(). Migrates the shared DB and seeds the replica
+    # from it when there is none yet (or the share moved and nothing is
+    # queued). Returns True when the share was reachable; raises when it is
+    # not and there is no replica to start from.
+    os.makedirs(db.REPLICA_DIR, exist_ok=True)
+    shared = db.connection_manager(db.DB_NAME)
+    try:
+        with shared.connection() as conn:
+            db.init_schema(conn)
+        online = True
+    except (sqlite3.Error, OSError):
+        online = False
+
+    local = db.connection_manager(db.REPLICA_DB)
+    try:
+        seed = not os.path.exists(db.REPLICA_DB)
+        if online and not seed:
+            with local.connection() as conn:
+                _create_sync_tables(conn)
+                moved = _get_state(conn, "shared_path") != db.DB_NAME
+                pending = conn.execute("SELECT COUNT(*) FROM sync_outbox").fetchone()[0]
+            seed = moved and not pending
+            local.close()
+        if seed:
+            if not online:
+                raise RuntimeError(f"Shared database unavailable and no local replica:\n{db.DB_NAME}")
+            _seed(shared)
+        with local.connection() as conn:
+            db.init_schema(conn)
+            _create_sync_tables(conn)
+            if seed:
+                # The copy's own change log says how far it is up to date.
+                conn.execute("DELETE FROM sync_outbox")
+                _set_state(conn, "last_pulled_seq", _max_seq(conn))
+                _set_state(conn, "shared_path", db.DB_NAME)
+    finally:
+        local.close()
+        shared.close()
+    return online
+
+
+def _upsert_company(conn, row, insertable):
+    # row = (uuid, name, updated_at). Returns False when the target kept a
+    # newer version or the company was deleted there (the incoming change lost).
+    uuid, name, updated_at = row
+    cur = conn.execute("SELECT name, updated_at FROM companies WHERE uuid=?", (uuid,)).fetchone()
+    if cur is None:
+        if not insertable:
+            return False
+        conn.execute(
+            "INSERT INTO companies (name, done_date, next_date, uuid, updated_at) VALUES (?, '', '', ?, ?)",
+            (name, uuid, updated_at),
+        )
+        return True
+    if (cur[1] or "") > (updated_at or ""):
+        return False
+    if cur != (name, updated_at):
+        conn.execute("UPDATE companies SET name=?, updated_at=? WHERE uuid=?", (name, updated_at, uuid))
+    return True
+
+def _upsert_inspection(conn, row, insertable):
+    # row = (uuid, company_uuid, done, next, notes, updated_at).
+    uuid, company_uuid, done, next_, notes, updated_at = row
+    company = conn.execute("SELECT id FROM companies WHERE uuid=?", (company_uuid,)).fetchone()
+    if company is None:
+        return False
+    cur = conn.execute(
+        "SELECT done_date, next_date, notes, updated_at FROM inspections WHERE uuid=?", (uuid,)
+    ).fetchone()
+    if cur is None:
+        if not insertable:
+            return False
+        conn.execute(
+            "INSERT INTO inspections (company_id, done_date, next_date, notes, uuid, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (company[0], done, next_, notes, uuid, updated_at),
+        )
+        return True
+    if (cur[3] or "") > (updated_at or ""):
+        return False
+    if cur != (done, next_, notes, updated_at):
+        conn.execute(
+            "UPDATE inspections SET done_date=?, next_date=?, notes=?, updated_at=? WHERE uuid=?",
+            (done, next_, notes, updated_at, uuid),
+        )
+    return True
+
+def _delete_company(conn, uuid):
+    conn.execute(
+        "DELETE FROM inspections WHERE company_id IN (SELECT id FROM companies WHERE uuid=?)", (uuid,)
+    )
+    conn.execute("DELETE FROM companies WHERE uuid=?", (uuid,))
+
+def _company_rows(conn, uuids):
+    rows = {}
+    uuids = list(uuids)
+    for i in range(0, len(uuids), 500):
+        chunk = uuids[i:i + 500]
+        cur = conn.execute(
+            f"SELECT uuid, name, updated_at FROM companies WHERE uuid IN ({','.join('?' * len(chunk))})",
+            chunk,
+        )
+        rows.update((r[0], r) for r in cur.fetchall())
+    return rows
+
+def _inspection_rows(conn, where, params):
+    cur = conn.execute(f"""
+        SELECT i.uuid, c.uuid, i.done_date, i.next_date, i.notes, i.updated_at
+        FROM inspections i
+        JOIN companies c ON c.id = i.company_id
+        WHERE {where}
+        ORDER BY i.id
+    """, params)
+    return cur.fetchall()
+
+
+class ReplicaSync:
+    # Background push/pull between the local replica and the shared DB.
+    # Uses its own connections: the app's data_version poller then sees the
+    # pulled rows as "another connection committed" and refreshes the view.
+
+    def __init__(self, interval=SYNC_INTERVAL_SECONDS):
+        self.shared = db.connection_manager(db.DB_NAME)
+        self.local = db.connection_manager(db.REPLICA_DB)
+        self._lock = threading.Lock()
+        self._task = PeriodicTask(interval, self.sync_once)
+        self.last_sync = None
+        self.last_error = None
+        self.conflicts = 0
+        self.pushed = 0
+        self.pulled = 0
+
+    def start(self):
+        self._task.start()
+        return self
+
+    def stop(self):
+        self._task.stop()
+
+    def sync_once(self):
+        # Returns True when both directions completed.
+        with self._lock:
+            try:
+                self.pushed += self._push()
+                self.pulled += self._pull()
+            except (sqlite3.Error, OSError) as e:
+                # Share unreachable or locked: keep the queue and retry next tick.
+                self.last_error = str(e)
+                self.shared.close()
+                return False
+            self.last_error = None
+            self.last_sync = datetime.now()
+            return True
+
+    def _push(self):
+        with self.local.connection() as lconn:
+            queued = lconn.execute("SELECT id, table_name, uuid, op FROM sync_outbox ORDER BY id").fetchall()
+            if not queued:
+                return 0
+            ops = {}
+            for _, table, uuid, op in queued:
+                ops.setdefault((table, uuid), set()).add(op)
+            company_uuids = [u for t, u in ops if t == "companies"]
+            inspection_uuids = [u for t, u in ops if t == "inspections"]
+            companies = _company_rows(lconn, company_uuids)
+            inspections = {}
+            for i in range(0, len(inspection_uuids), 500):
+                chunk = inspection_uuids[i:i + 500]
+                for r in _inspection_rows(lconn, f"i.uuid IN ({','.join('?' * len(chunk))})", chunk):
+                    inspections[r[0]] = r
+
+        conflicts = 0
+        with self.shared.write_transaction() as sconn:
+            for uuid in company_uuids:
+                row = companies.get(uuid)
+                if row is not None and not _upsert_company(sconn, row, "insert" in ops[("companies", uuid)]):
+                    conflicts += 1
+            for uuid in inspection_uuids:
+                row = inspections.get(uuid)
+                if row is None:
+                    sconn.execute("DELETE FROM inspections WHERE uuid=?", (uuid,))
+                elif not _upsert_inspection(sconn, row, "insert" in ops[("inspections", uuid)]):
+                    conflicts += 1
+            for uuid in company_uuids:
+                if uuid not in companies:
+                    _delete_company(sconn, uuid)
+
+        with self.local.connection() as lconn:
+            lconn.execute("DELETE FROM sync_outbox WHERE id <= ?", (queued[-1][0],))
+        self.conflicts += conflicts
+        return len(ops)
+
+    def _pull(self):
+        with self.local.connection() as lconn:
+            last_seq = int(_get_state(lconn, "last_pulled_seq", 0))
+        with self.shared.connection() as sconn:
+            max_seq, min_seq = sconn.execute(
+                "SELECT COALESCE(MAX(seq), 0), COALESCE(MIN(seq), 0) FROM change_log"
+            ).fetchone()
+            if max_seq <= last_seq:
+                return 0
+            full = min_seq > last_seq + 1
+            if full:
+                # Entries we never saw were pruned: compare every company.
+                uuids = {r[0] for r in sconn.execute("SELECT uuid FROM companies")}
+            else:
+                uuids = {r[0] for r in sconn.execute(
+                    "SELECT DISTINCT company_uuid FROM change_log "
+                    "WHERE seq > ? AND seq <= ? AND company_uuid IS NOT NULL",
+                    (last_seq, max_seq),
+                )}
+            companies = _company_rows(sconn, uuids)
+            inspections = []
+            found = list(companies)
+            for i in range(0, len(found), 500):
+                chunk = found[i:i + 500]
+                inspections.extend(_inspection_rows(sconn, f"c.uuid IN ({','.join('?' * len(chunk))})", chunk))
+
+        with self.local.write_transaction() as lconn:
+            before = lconn.execute("SELECT COALESCE(MAX(id), 0) FROM sync_outbox").fetchone()[0]
+            if full:
+                uuids |= {r[0] for r in lconn.execute("SELECT uuid FROM companies")}
+                # Keep rows added locally that are still waiting to be pushed.
+                uuids -= {r[0] for r in lconn.execute(
+                    "SELECT uuid FROM sync_outbox WHERE table_name='companies'"
+                )}
+            for uuid in uuids:
+                row = companies.get(uuid)
+                if row is None:
+                    _delete_company(lconn, uuid)
+                else:
+                    _upsert_company(lconn, row, True)
+            for row in inspections:
+                _upsert_inspection(lconn, row, True)
+            # Applying remote rows fired the outbox triggers; those are not local edits.
+            lconn.execute("DELETE FROM sync_outbox WHERE id > ?", (before,))
+            _set_state(lconn, "last_pulled_seq", max_seq)
+        return len(uuids)
+
+    def stats(self):
+        try:
+            with self.local.connection() as conn:
+                pending = conn.execute("SELECT COUNT(*) FROM sync_outbox").fetchone()[0]
+        except sqlite3.Error:
+            pending = None
+        return {
+            "online": self.last_error is None,
+            "pending": pending,
+            "last_sync": self.last_sync,
+            "last_error": self.last_error,
+            "conflicts": self.conflicts,
+            "pushed": self.pushed,
+            "pulled": self.pulled,
+        }
@@ -0,0 +1,76 @@
+# search_index.py
+import unicodedata
+from collections import defaultdict
+
+# Katakana (ァ..ヶ) folds onto hiragana so either script matches the other.
+_KATAKANA_TO_HIRAGANA = {cp: cp - 0x60 for cp in range(0x30A1, 0x30F7)}
+
+
+def normalize(text):
+    # NFKC folds half-width katakana and full-width latin/digits,
+    # casefold handles latin case.
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return text.translate(_KATAKANA_TO_HIRAGANA)
+
+
+def _grams(key):
+    grams = set(key)
+    grams.update(key[i:i + 2] for i in range(len(key) - 1))
+    return grams
+
+
+class SearchIndex:
+    # Pre-normalized name keys plus unigram/bigram postings (gram -> ids).
+    # Substring queries intersect the bigram postings, then verify the
+    # few surviving candidates against their keys.
+
+    def __init__(self, rows=()):
+        self._keys = {}
+        self._postings = defaultdict(set)
+        for c in rows:
+            self.add(c["id"], c["name"])
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, cid, name):
+        key = normalize(name)
+        old = self._keys.get(cid)
+        if old == key:
+            return
+        if old is not None:
+            self.remove(cid)
+        self._keys[cid] = key
+        for g in _grams(key):
+            self._postings[g].add(cid)
+
+    def remove(self, cid):
+        key = self._keys.pop(cid, None)
+        if key is None:
+            return
+        for g in _grams(key):
+            ids = self._postings.get(g)
+            if ids is not None:
+                ids.discard(cid)
+                if not ids:
+                    del self._postings[g]
+
+    def search(self, query):
+        # Returns the matching ids, or None when the query matches everything.
+        q = normalize(query)
+        if not q:
+            return None
+        if len(q) == 1:
+            return set(self._postings.get(q, ()))
+
+        postings = []
+        for g in {q[i:i + 2] for i in range(len(q) - 1)}:
+            ids = self._postings.get(g)
+            if not ids:
+                return set()
+            postings.append(ids)
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        if len(q) == 2:
+            return candidates
+        return {cid for cid in candidates if q in self._keys[cid]}
@@ -0,0 +1,84 @@
+# status.py
+from datetime import date, datetime, timedelta
+
+EXPIRED = "expired"
+DUE_SOON = "due_soon"
+OK = "ok"
+NO_DATA = "no_data"
+
+STATUS_LABELS = {
+    EXPIRED: "🚨 期限切れ | Expired",
+    DUE_SOON: "⚠️ 期限間近 | Due Soon",
+    OK: "✅ 正常 | OK",
+    NO_DATA: "未点検 | No data",
+}
+
+
+# ── Status Logic (Calendar Month Based) ───────────────────────
+def get_warning_start_date(next_date_obj):
+    year = next_date_obj.year
+    month = next_date_obj.month - 2
+    if month <= 0:
+        month += 12
+        year -= 1
+    return date(year, month, 1)
+
+def calculate_next_date(done_date):
+    # Rule: next date = same calendar day next year, minus one day.
+    try:
+        same_day_next_year = done_date.replace(year=done_date.year + 1)
+    except ValueError:
+        # Handle Feb 29 -> Feb 28 for non-leap years.
+        same_day_next_year = done_date.replace(year=done_date.year + 1, day=28)
+    return same_day_next_year - timedelta(days=1)
+
+def parse_ordinals(next_str):
+    # (next ordinal, warning start ordinal), or None when there is no date.
+    if not next_str:
+        return None
+    next_dt = datetime.strptime(next_str, "%Y-%m-%d").date()
+    return next_dt.toordinal(), get_warning_start_date(next_dt).toordinal()
+
+def classify(ordinals, today_ord):
+    if ordinals is None:
+        return NO_DATA
+    next_ord, warn_ord = ordinals
+    if today_ord > next_ord:
+        return EXPIRED
+    if today_ord >= warn_ord:
+        return DUE_SOON
+    return OK
+
+
+class StatusEngine:
+    # Classifies every company in a CompanyStore in one pass over ordinal ints.
+    # Dates are parsed once per (id, next date) and the result is cached until
+    # the day changes or the store is mutated.
+
+    def __init__(self, store):
+        self.store = store
+        self._parsed = {}
+        self._key = None
+        self._statuses = {}
+
+    def _ordinals(self, c):
+        cached = self._parsed.get(c["id"])
+        if cached is None or cached[0] != c["next"]:
+            cached = self._parsed[c["id"]] = (c["next"], parse_ordinals(c["next"]))
+        return cached[1]
+
+    def statuses(self, today=None):
+        today_ord = (today or date.today()).toordinal()
+        key = (today_ord, self.store.version)
+        if key != self._key:
+            self._statuses = {
+                c["id"]: classify(self._ordinals(c), today_ord)
+                for c in self.store
+            }
+            if len(self._parsed) > len(self._statuses):
+                self._parsed = {cid: v for cid, v in self._parsed.items() if cid in self._statuses}
+            self._key = key
+        return self._statuses
+
+    def status_of(self, cid, today=None):
+        return self.statuses(today).get(cid, NO_DATA)
@@ -0,0 +1,99 @@
+# store.py
+import bisect
+
+from search_index import SearchIndex
+
+# Full reload from the DB after this many in-place mutations, to pick up
+# anything the incremental path could have missed.
+RECONCILE_EVERY = 100
+
+
+def _name_key(c):
+    return c["name"].lower()
+
+def _next_key(c):
+    return c["next"] or ""
+
+SORT_KEYS = {
+    "name": _name_key,
+    "next": _next_key,
+}
+
+
+class CompanyStore:
+    # In-memory view of load_companies(): rows keyed by id plus one sorted
+    # (key, id) list per sort order, patched in place on every edit.
+
+    def __init__(self, rows=()):
+        self.version = 0
+        self.reload(rows)
+
+    def reload(self, rows):
+        self._by_id = {c["id"]: c for c in rows}
+        self._orders = {
+            name: sorted((key(c), c["id"]) for c in self._by_id.values())
+            for name, key in SORT_KEYS.items()
+        }
+        self.index = SearchIndex(self._by_id.values())
+        self.mutations = 0
+        self.version += 1
+
+    def due_for_reconcile(self):
+        return self.mutations >= RECONCILE_EVERY
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, cid):
+        return cid in self._by_id
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def get(self, cid):
+        return self._by_id.get(cid)
+
+    def upsert(self, row):
+        old = self._by_id.get(row["id"])
+        if old is not None:
+            self._unindex(old)
+        self._by_id[row["id"]] = row
+        for name, key in SORT_KEYS.items():
+            bisect.insort(self._orders[name], (key(row), row["id"]))
+        self.index.add(row["id"], row["name"])
+        self._touch()
+
+    def delete(self, cid):
+        old = self._by_id.pop(cid, None)
+        if old is None:
+            return False
+        self._unindex(old)
+        self.index.remove(cid)
+        self._touch()
+        return True
+
+    def ordered(self, sort_by="name", reverse=False, ids=None):
+        # With `ids`, only that subset is sorted (cheap for narrow searches).
+        if ids is None:
+            order = self._orders[sort_by]
+        else:
+            key = SORT_KEYS[sort_by]
+            order = sorted((key(self._by_id[cid]), cid) for cid in ids if cid in self._by_id)
+        if reverse:
+            order = reversed(order)
+        return [self._by_id[cid] for _, cid in order]
+
+    def search(self, query, sort_by="name", reverse=False):
+        return self.ordered(sort_by, reverse, self.index.search(query))
+
+    def _unindex(self, row):
+        for name, key in SORT_KEYS.items():
+            order = self._orders[name]
+            entry = (key(row), row["id"])
+            i = bisect.bisect_left(order, entry)
+            if i < len(order) and order[i] == entry:
+                del order[i]
+
+    def _touch(self):
+        self.mutations += 1
+        self.version += 1
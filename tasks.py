@@ -0,0 +1,193 @@
+# tasks.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Debouncer:
+    # Calls fn(*args) once calls have been quiet for `delay` seconds. Only
+    # the latest call wins: anything superseded before it runs is dropped and
+    # counted as suppressed. The timer thread hands the call to
+    # dispatch(fn, *args) (by default it runs on the timer thread), the same
+    # hook JobRunner uses to get back onto the UI loop.
+
+    def __init__(self, delay, fn, dispatch=None):
+        self.delay = delay
+        self.fn = fn
+        self.dispatch = dispatch or (lambda fn, *args: fn(*args))
+        self._lock = threading.Lock()
+        self._run_lock = threading.Lock()
+        self._timer = None
+        self._generation = 0
+        self.calls = 0
+        self.runs = 0
+        self.suppressed = 0
+
+    def __call__(self, *args):
+        with self._lock:
+            self.calls += 1
+            self._generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self.suppressed += 1
+            self._timer = threading.Timer(self.delay, self._fire, (self._generation, args))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _fire(self, generation, args):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._timer = None
+        self.dispatch(self._deliver, generation, args)
+
+    def _deliver(self, generation, args):
+        # Checked again on delivery: a call made after the timer fired wins.
+        with self._run_lock:
+            with self._lock:
+                if generation != self._generation:
+                    self.suppressed += 1
+                    return
+                self.runs += 1
+            self.fn(*args)
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+                self.suppressed += 1
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "runs": self.runs, "suppressed": self.suppressed}
+
+
+class PeriodicTask:
+    # Calls fn() every `interval` seconds on a daemon thread until stop().
+    # Errors are passed to on_error (if given) and do not end the loop.
+
+    def __init__(self, interval, fn, on_error=None):
+        self.interval = interval
+        self.fn = fn
+        self.on_error = on_error
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.fn()
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(e)
+
+    def stop(self):
+        self._stop.set()
+
+
+class Job:
+    # Handle returned by JobRunner.submit(); cancel() drops its callbacks.
+    __slots__ = ("key", "cancelled", "future")
+
+    def __init__(self, key):
+        self.key = key
+        self.cancelled = False
+        self.future = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class JobRunner:
+    # Runs blocking DB / file work on a small thread pool so UI handlers
+    # return at once. on_done(result) / on_error(exc) are handed to
+    # dispatch(fn, *args), which marshals them back to the UI (by default
+    # they run on the worker). Submitting with a `key` cancels the previous
+    # job with that key: if it has not started it never runs, otherwise its
+    # result is dropped. on_busy(active_jobs) is dispatched on every change.
+
+    def __init__(self, dispatch=None, on_busy=None, max_workers=4):
+        self.dispatch = dispatch or (lambda fn, *args: fn(*args))
+        self.on_busy = on_busy
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._latest = {}
+        self.active = 0
+        self.submitted = 0
+        self.superseded = 0
+        self.failed = 0
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None):
+        job = Job(key)
+        previous = None
+        with self._lock:
+            self.submitted += 1
+            if key is not None:
+                previous = self._latest.get(key)
+                if previous is not None:
+                    self.superseded += 1
+                self._latest[key] = job
+            self.active += 1
+        if previous is not None:
+            # Outside the lock: cancelling runs the done callback (_finished).
+            previous.cancel()
+        self._busy()
+        job.future = self._executor.submit(self._run, job, fn, args, on_done, on_error)
+        # Also fires for jobs cancelled before they started.
+        job.future.add_done_callback(lambda _: self._finished(job))
+        return job
+
+    def _run(self, job, fn, args, on_done, on_error):
+        if job.cancelled:
+            return
+        try:
+            result = fn(*args)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            if on_error is None:
+                raise
+            self.dispatch(self._deliver, job, on_error, e)
+            return
+        if on_done is not None:
+            self.dispatch(self._deliver, job, on_done, result)
+
+    def _deliver(self, job, callback, value):
+        if not job.cancelled:
+            callback(value)
+
+    def _finished(self, job):
+        with self._lock:
+            self.active -= 1
+            if self._latest.get(job.key) is job:
+                del self._latest[job.key]
+        self._busy()
+
+    def _busy(self):
+        if self.on_busy is not None:
+            self.dispatch(self._report_busy)
+
+    def _report_busy(self):
+        # Reads the count when delivered, so late notifications are not stale.
+        self.on_busy(self.active)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self.active,
+                "submitted": self.submitted,
+                "superseded": self.superseded,
+                "failed": self.failed,
+            }
@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# db.py resolves its data folder and config.json at import time, so point
+# both at a throwaway directory before any test imports it.
+_root = tempfile.mkdtemp(prefix="inspection-tests-")
+os.environ["APPDATA"] = _root
+os.environ["ANNUAL_INSPECTION_DATA_DIR"] = os.path.join(_root, "data")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    # An empty database per test behind db.py's module-level connection.
+    manager = db.ConnectionManager(str(tmp_path / "inspection.db"))
+    monkeypatch.setattr(db, "_manager", manager)
+    monkeypatch.setattr(db, "DB_NAME", manager.path)
+    db.invalidate_history()
+    db.init_db()
+    yield manager
+    manager.close()
+    db.invalidate_history()
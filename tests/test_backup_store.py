@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import backup_store
+import db
+
+START = datetime(2026, 1, 1, 9)
+
+
+def company_names(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {r[0] for r in conn.execute("SELECT name FROM companies")}
+    finally:
+        conn.close()
+
+
+def test_snapshot_skip_dedup_and_restore(fresh_db, tmp_path):
+    root = str(tmp_path / "store")
+    for i in range(500):
+        db.add_company(f"c{i}")
+
+    first = backup_store.create_snapshot(root, now=START)
+    unchanged = backup_store.create_snapshot(root, now=START + timedelta(hours=1))
+    db.add_company("late")
+    second = backup_store.create_snapshot(root, now=START + timedelta(days=1))
+
+    assert not first["skipped"] and first["new_pages"] > 0
+    assert unchanged["skipped"] and unchanged["id"] == first["id"]
+    assert 0 < second["new_pages"] < second["total_pages"]
+
+    restored = backup_store.restore_snapshot(first["id"], str(tmp_path / "first.db"), root)
+    assert len(company_names(restored)) == 500
+    restored = backup_store.restore_snapshot(second["id"], str(tmp_path / "second.db"), root)
+    assert "late" in company_names(restored)
+
+
+def test_skip_shortcut_ignores_another_databases_sequence(fresh_db, tmp_path, monkeypatch):
+    root = str(tmp_path / "store")
+    db.add_company("from A")
+    first = backup_store.create_snapshot(root, now=START)
+
+    # A second replica sharing the store, at the same change_log sequence.
+    other = db.ConnectionManager(str(tmp_path / "other" / "inspection.db"))
+    monkeypatch.setattr(db, "_manager", other)
+    db.init_db()
+    db.add_company("from B")
+    assert db.latest_change_seq() == backup_store.list_snapshots(root)[0]["change_seq"]
+    assert not first["skipped"]
+    second = backup_store.create_snapshot(root, now=START + timedelta(days=1))
+    other.close()
+
+    assert not second["skipped"]
+    restored = backup_store.restore_snapshot(second["id"], str(tmp_path / "b.db"), root)
+    assert company_names(restored) == {"from B"}
+
+
+def test_snapshot_ids_are_unique_within_a_second(fresh_db, tmp_path):
+    root = str(tmp_path / "store")
+    results = []
+    for i in range(3):
+        db.add_company(f"c{i}")
+        results.append(backup_store.create_snapshot(root, now=START + timedelta(microseconds=i)))
+
+    # Each one got its own manifest; retention then keeps the day's newest.
+    assert len({r["id"] for r in results}) == 3
+    assert results[1]["pruned"] == [results[0]["id"]]
+    assert results[2]["pruned"] == [results[1]["id"]]
+    assert [s["id"] for s in backup_store.list_snapshots(root)] == [results[2]["id"]]
+
+
+def test_retention_keeps_gfs_snapshots_and_their_pages(fresh_db, tmp_path):
+    root = str(tmp_path / "store")
+    for day in range(120):
+        db.add_company(f"c{day}")
+        backup_store.create_snapshot(root, now=START + timedelta(days=day))
+    now = START + timedelta(days=119)
+
+    # Objects written above are fresh; sweep them as if the grace period passed.
+    backup_store.prune(root, now=now, grace_seconds=0)
+    db.add_company("final")
+    backup_store.create_snapshot(root, now=now)
+    backup_store.prune(root, now=now, grace_seconds=-1)
+
+    snapshots = backup_store.list_snapshots(root)
+    created = [datetime.fromisoformat(s["created"]) for s in snapshots]
+    assert len(snapshots) == 12
+    assert {d.date() for d in created} >= {(now - timedelta(days=n)).date() for n in range(6)}
+    assert created[0] == datetime(2026, 1, 31, 9)
+    for snap in snapshots:
+        dest = str(tmp_path / f"{snap['id']}.db")
+        backup_store.restore_snapshot(snap["id"], dest, root)
+        assert sqlite3.connect(dest).execute("PRAGMA integrity_check").fetchone() == ("ok",)
+
+
+def test_prune_keeps_unreferenced_objects_within_grace(fresh_db, tmp_path):
+    root = str(tmp_path / "store")
+    db.add_company("a")
+    backup_store.create_snapshot(root, now=START)
+    # A page object another instance's snapshot is about to reference.
+    pending = os.path.join(root, "objects", "ff", "f" * 64)
+    os.makedirs(os.path.dirname(pending), exist_ok=True)
+    with open(pending, "wb") as f:
+        f.write(b"")
+    stale = os.path.join(root, "objects", "ee", "e" * 64)
+    os.makedirs(os.path.dirname(stale), exist_ok=True)
+    with open(stale, "wb") as f:
+        f.write(b"")
+    old = time.time() - backup_store.OBJECT_GRACE_SECONDS - 60
+    os.utime(stale, (old, old))
+    db.add_company("b")
+
+    # Same day: the newer snapshot replaces the first, which triggers the sweep.
+    result = backup_store.create_snapshot(root, now=START + timedelta(hours=1))
+
+    assert len(result["pruned"]) == 1
+    assert os.path.exists(pending)
+    assert not os.path.exists(stale)
+
+
+def test_restore_rejects_a_corrupt_snapshot(fresh_db, tmp_path):
+    root = str(tmp_path / "store")
+    db.add_company("a")
+    snap = backup_store.create_snapshot(root, now=START)
+    manifest_path = os.path.join(root, "snapshots", f"{snap['id']}.json")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["pages"][0], manifest["pages"][-1] = manifest["pages"][-1], manifest["pages"][0]
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    dest = tmp_path / "restored.db"
+    with pytest.raises(ValueError):
+        backup_store.restore_snapshot(snap["id"], str(dest), root)
+    assert not dest.exists()
@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+
+import pytest
+
+import db
+
+
+@pytest.fixture
+def contended_db(tmp_path, monkeypatch):
+    # DELETE journaling (what "auto" picks for the shared DB) and a short
+    # busy timeout, so a held reader makes COMMIT time out quickly.
+    manager = db.ConnectionManager(str(tmp_path / "inspection.db"), journal_mode="delete", busy_timeout_ms=50)
+    monkeypatch.setattr(db, "_manager", manager)
+    db.init_db()
+    yield manager
+    manager.close()
+
+
+def hold_read_lock(path):
+    reader = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    reader.execute("BEGIN")
+    reader.execute("SELECT COUNT(*) FROM companies").fetchone()
+    return reader
+
+
+def company_count(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_commit_timeout_rolls_back(contended_db):
+    reader = hold_read_lock(contended_db.path)
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            db.add_company("Acme")
+        assert not contended_db.open().in_transaction
+    finally:
+        reader.rollback()
+        reader.close()
+
+    # The failed save is not committed by the next read, and writes work again.
+    db.load_companies()
+    assert company_count(contended_db.path) == 0
+    db.add_company("Beta")
+    assert company_count(contended_db.path) == 1
+
+
+def test_commit_timeout_is_retried_cleanly(contended_db):
+    reader = hold_read_lock(contended_db.path)
+    release = threading.Timer(0.1, lambda: (reader.rollback(), reader.close()))
+    release.start()
+    try:
+        db.add_company("Acme")
+    finally:
+        release.join()
+
+    assert db.get_connection_stats()["lock_retries"] > 0
+    assert company_count(contended_db.path) == 1
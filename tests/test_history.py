@@ -0,0 +1,81 @@
+import sqlite3
+
+import db
+
+
+def all_pages(cid, limit):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = db.load_inspection_history_page(cid, cursor, limit)
+        rows.extend(page)
+        pages += 1
+        if cursor is None:
+            return rows, pages
+
+
+def test_pages_walk_the_full_history_in_order(fresh_db):
+    cid = db.add_company("Acme")
+    for year in range(2000, 2030):
+        for month in (1, 4, 7, 10):
+            db.add_inspection(cid, f"{year}-{month:02d}-01", "", "")
+
+    rows, pages = all_pages(cid, 50)
+
+    assert pages == 3
+    assert [(r["done"], r["notes"]) for r in rows] == [
+        (h["done"], h["notes"]) for h in db.load_inspection_history(cid)
+    ]
+    assert len({r["id"] for r in rows}) == 120
+
+
+def test_ties_and_missing_dates_across_page_boundaries(fresh_db):
+    cid = db.add_company("Acme")
+    ids = [db.add_inspection(cid, "2025-01-01", "", str(i)) for i in range(7)]
+    ids += [db.add_inspection(cid, None, "2026-01-01", f"n{i}") for i in range(5)]
+    ids.append(db.add_inspection(cid, "2026-01-01", "", "newest"))
+
+    rows, pages = all_pages(cid, 3)
+
+    assert pages == 5
+    assert sorted(r["id"] for r in rows) == sorted(ids)
+    assert rows[0]["notes"] == "newest"
+    # Same date: newest entry first. Missing done dates come last.
+    assert [r["notes"] for r in rows[1:8]] == [str(i) for i in reversed(range(7))]
+    assert all(r["done"] is None for r in rows[8:])
+
+
+def test_single_page_has_no_cursor(fresh_db):
+    cid = db.add_company("Acme")
+    db.add_inspection(cid, "2025-01-01", "2025-12-31", "")
+
+    rows, cursor = db.load_inspection_history_page(cid)
+
+    assert len(rows) == 1 and cursor is None
+    assert db.load_inspection_history_page(db.add_company("Empty")) == ([], None)
+
+
+def test_own_write_invalidates_cached_pages(fresh_db):
+    cid = db.add_company("Acme")
+    db.add_inspection(cid, "2024-01-01", "", "")
+    assert len(db.load_inspection_history_page(cid)[0]) == 1
+
+    db.add_inspection(cid, "2025-01-01", "", "")
+
+    rows, _ = db.load_inspection_history_page(cid)
+    assert [r["done"] for r in rows] == ["2025-01-01", "2024-01-01"]
+
+
+def test_other_connection_write_invalidates_cached_pages(fresh_db):
+    cid = db.add_company("Acme")
+    db.add_inspection(cid, "2024-01-01", "", "")
+    assert len(db.load_inspection_history_page(cid)[0]) == 1
+
+    other = sqlite3.connect(fresh_db.path)
+    with other:
+        other.execute(
+            "INSERT INTO inspections (company_id, done_date, next_date, notes) VALUES (?, '2025-01-01', '', '')",
+            (cid,),
+        )
+    other.close()
+
+    assert len(db.load_inspection_history_page(cid)[0]) == 2
@@ -0,0 +1,84 @@
+import db
+from importer import parse_csv
+
+
+def record(name, done, next_, notes=""):
+    return {"name": name, "done": done, "next": next_, "notes": notes}
+
+
+def latest(cid):
+    return db.load_companies_by_ids([cid])[0]
+
+
+def test_import_creates_companies_and_latest(fresh_db):
+    summary = db.import_records([
+        record("Acme", "2024-01-10", "2025-01-10"),
+        record("Acme", "2025-01-10", "2026-01-10"),
+        record("Beta", "2025-06-01", "2026-06-01"),
+    ])
+    assert summary == {
+        "companies_added": 2,
+        "companies_matched": 0,
+        "inspections_added": 3,
+        "duplicates_skipped": 0,
+    }
+    rows = {c["name"]: c for c in db.load_companies()}
+    assert rows["Acme"]["done"] == "2025-01-10"
+    assert rows["Beta"]["next"] == "2026-06-01"
+
+
+def test_import_older_history_keeps_current_inspection(fresh_db):
+    cid = db.add_company("Acme")
+    db.add_inspection(cid, "2026-01-10", "2027-01-10", "current")
+
+    summary = db.import_records([
+        record("ACME", "2020-01-10", "2021-01-10", "old"),
+        record("ａｃｍｅ", "2019-01-10", "2020-01-10", "older"),
+    ])
+
+    assert summary["companies_added"] == 0
+    assert summary["companies_matched"] == 1
+    assert summary["inspections_added"] == 2
+    row = latest(cid)
+    assert (row["done"], row["next"], row["notes"]) == ("2026-01-10", "2027-01-10", "current")
+    assert [h["done"] for h in db.load_inspection_history(cid)] == ["2026-01-10", "2020-01-10", "2019-01-10"]
+
+
+def test_import_newer_inspection_becomes_latest(fresh_db):
+    cid = db.add_company("Acme")
+    db.add_inspection(cid, "2025-01-10", "2026-01-10", "")
+
+    db.import_records([record("Acme", "2026-02-01", "2027-02-01")])
+
+    assert latest(cid)["done"] == "2026-02-01"
+
+
+def test_reimport_skips_duplicates(fresh_db):
+    records = [record("Acme", "2025-01-10", "2026-01-10"), record("Beta", "", "2026-03-01")]
+    db.import_records(records)
+
+    summary = db.import_records(records)
+
+    assert summary["companies_added"] == 0
+    assert summary["inspections_added"] == 0
+    assert summary["duplicates_skipped"] == 2
+    assert len(db.load_companies()) == 2
+
+
+
+def test_parse_errors_report_the_rows_first_line(tmp_path):
+    path = tmp_path / "companies.csv"
+    path.write_text(
+        "Company,Last,Next,Status,Notes\n"
+        'Acme,2025-01-10,2026-01-10,OK,"line one\nline two\nline three"\n'
+        "\n"
+        "Beta,10/01/2025,,,\n"
+        ',2025-01-10,,,"no\nname"\n',
+        encoding="utf-8",
+    )
+
+    records, errors = parse_csv(str(path))
+
+    assert [r["name"] for r in records] == ["Acme"]
+    assert records[0]["notes"] == "line one\nline two\nline three"
+    assert errors == [(6, "Dates must be YYYY-MM-DD"), (7, "Company name is empty")]
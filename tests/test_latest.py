@@ -0,0 +1,43 @@
+import time
+
+import db
+
+
+def latest(cid):
+    return db.load_companies_by_ids([cid])[0]
+
+
+def test_correcting_a_date_from_the_form_takes_effect(fresh_db):
+    row = db.save_company_with_inspection(None, "Acme", "2027-10-15", "2028-10-14", "")
+    time.sleep(0.01)
+
+    row = db.save_company_with_inspection(row["id"], "Acme", "2026-10-15", "2027-10-14", "")
+
+    assert (row["done"], row["next"]) == ("2026-10-15", "2027-10-14")
+    assert latest(row["id"])["done"] == "2026-10-15"
+
+
+def test_deleting_latest_falls_back_to_the_previous_save(fresh_db):
+    cid = db.add_company("Acme")
+    db.add_inspection(cid, "2025-01-10", "2026-01-10", "")
+    time.sleep(0.01)
+    db.add_inspection(cid, "2024-01-10", "2025-01-10", "")
+    time.sleep(0.01)
+    newest = db.add_inspection(cid, "2026-01-10", "2027-01-10", "")
+
+    with db.get_connection() as conn:
+        conn.execute("DELETE FROM inspections WHERE id=?", (newest,))
+
+    assert latest(cid)["done"] == "2024-01-10"
+
+
+def test_same_save_time_falls_back_to_done_date(fresh_db):
+    cid = db.add_company("Acme")
+    with db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO inspections (company_id, done_date, next_date, notes, uuid, updated_at) "
+            "VALUES (?, ?, '', '', ?, '2026-01-01T00:00:00.000Z')",
+            [(cid, "2025-01-10", "u1"), (cid, "2026-01-10", "u2"), (cid, "2024-01-10", "u3")],
+        )
+
+    assert latest(cid)["done"] == "2026-01-10"
@@ -0,0 +1,149 @@
+import time
+
+import pytest
+
+import db
+import replica
+
+
+class Client:
+    # One app instance in replica mode: its own local copy and ReplicaSync.
+
+    def __init__(self, root, monkeypatch):
+        self.monkeypatch = monkeypatch
+        monkeypatch.setattr(db, "REPLICA_DIR", str(root))
+        monkeypatch.setattr(db, "REPLICA_DB", str(root / "inspection.db"))
+        assert replica.prepare()
+        self.sync = replica.ReplicaSync()
+
+    def call(self, fn, *args):
+        # Runs a db.py function against this client's local copy.
+        with self.monkeypatch.context() as m:
+            m.setattr(db, "_manager", self.sync.local)
+            return fn(*args)
+
+    def companies(self):
+        return {c["name"]: c for c in self.call(db.load_companies)}
+
+    def close(self):
+        self.sync.local.close()
+        self.sync.shared.close()
+
+
+@pytest.fixture
+def share(tmp_path, monkeypatch):
+    manager = db.ConnectionManager(str(tmp_path / "share" / "inspection.db"))
+    monkeypatch.setattr(db, "DB_NAME", manager.path)
+    monkeypatch.setattr(db, "_manager", manager)
+    db.init_db()
+    db.invalidate_history()
+    yield manager
+    manager.close()
+    db.invalidate_history()
+
+
+@pytest.fixture
+def clients(tmp_path, monkeypatch, share):
+    made = []
+
+    def make(name):
+        client = Client(tmp_path / name, monkeypatch)
+        made.append(client)
+        return client
+    yield make
+    for client in made:
+        client.close()
+
+
+def shared_companies():
+    return {c["name"]: c for c in db.load_companies()}
+
+
+def test_local_edits_reach_the_share_and_other_clients(clients):
+    a, b = clients("a"), clients("b")
+    cid = a.call(db.add_company, "Acme")
+    a.call(db.add_inspection, cid, "2026-01-10", "2027-01-10", "")
+
+    assert a.sync.sync_once() and b.sync.sync_once()
+
+    assert shared_companies()["Acme"]["done"] == "2026-01-10"
+    assert b.companies()["Acme"]["done"] == "2026-01-10"
+    assert a.sync.stats()["pending"] == 0
+
+
+def test_latest_inspection_converges_across_clients(clients):
+    cid = db.add_company("Acme")
+    a, b = clients("a"), clients("b")
+
+    # Same done date on both sides: A offline, B syncs first, then A.
+    a.call(db.add_inspection, cid, "2026-03-01", "2027-03-01", "from A")
+    time.sleep(0.01)
+    b.call(db.add_inspection, cid, "2026-03-01", "2027-03-01", "from B")
+    assert b.sync.sync_once()
+    assert a.sync.sync_once()
+    assert b.sync.sync_once()
+
+    latest = {
+        "share": shared_companies()["Acme"]["notes"],
+        "a": a.companies()["Acme"]["notes"],
+        "b": b.companies()["Acme"]["notes"],
+    }
+    assert latest == {"share": "from B", "a": "from B", "b": "from B"}
+
+
+def test_later_save_wins_regardless_of_sync_order(clients):
+    cid = db.add_company("Acme")
+    a, b = clients("a"), clients("b")
+
+    a.call(db.add_inspection, cid, "2026-05-01", "2027-05-01", "typo")
+    time.sleep(0.01)
+    b.call(db.add_inspection, cid, "2026-02-01", "2027-02-01", "corrected")
+    assert b.sync.sync_once()
+    assert a.sync.sync_once()
+    assert b.sync.sync_once()
+
+    for companies in (shared_companies(), a.companies(), b.companies()):
+        assert companies["Acme"]["notes"] == "corrected"
+
+
+def test_rename_conflict_is_last_writer_wins(clients):
+    cid = db.add_company("Acme")
+    a, b = clients("a"), clients("b")
+
+    a.call(db.update_company, cid, "Acme East")
+    time.sleep(0.01)
+    b.call(db.update_company, cid, "Acme West")
+    assert b.sync.sync_once()
+    assert a.sync.sync_once()
+    assert b.sync.sync_once()
+
+    assert a.sync.stats()["conflicts"] == 1
+    assert set(shared_companies()) == set(a.companies()) == set(b.companies()) == {"Acme West"}
+
+
+def test_delete_is_not_resurrected_by_an_offline_edit(clients):
+    cid = db.add_company("Acme")
+    a, b = clients("a"), clients("b")
+
+    b.call(db.update_company, cid, "Acme Renamed")
+    a.call(db.delete_company, cid)
+    assert a.sync.sync_once()
+    assert b.sync.sync_once()
+
+    assert shared_companies() == {}
+    assert b.companies() == {}
+
+
+def test_unreachable_share_keeps_the_outbox(clients, monkeypatch, tmp_path):
+    a = clients("a")
+    a.call(db.add_company, "Acme")
+    # A path below a regular file can never be opened.
+    blocker = tmp_path / "not-a-dir"
+    blocker.write_text("")
+    monkeypatch.setattr(a.sync, "shared", db.ConnectionManager(str(blocker / "inspection.db")))
+
+    assert not a.sync.sync_once()
+
+    stats = a.sync.stats()
+    assert not stats["online"]
+    assert stats["pending"] == 1
@@ -0,0 +1,71 @@
+import sqlite3
+import threading
+import time
+
+import db
+
+LEGACY_SCHEMA = """
+    CREATE TABLE companies (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, done_date TEXT, next_date TEXT
+    );
+    CREATE TABLE inspections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, company_id INTEGER NOT NULL,
+        done_date TEXT, next_date TEXT, notes TEXT
+    );
+    CREATE INDEX idx_companies_name ON companies(name);
+    CREATE INDEX idx_companies_next ON companies(next_date);
+    CREATE INDEX idx_inspections_company_date ON inspections(company_id, done_date);
+    CREATE INDEX idx_companies_name_nocase ON companies(name COLLATE NOCASE);
+    INSERT INTO companies (name, done_date, next_date) VALUES ('Acme', '2025-01-10', '2026-01-09');
+    INSERT INTO inspections (company_id, done_date, next_date, notes) VALUES (1, '2024-01-10', '2025-01-09', '');
+    INSERT INTO inspections (company_id, done_date, next_date, notes) VALUES (1, '2025-01-10', '2026-01-09', '');
+"""
+
+
+def legacy_db(tmp_path):
+    path = str(tmp_path / "inspection.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+    return path
+
+
+def test_legacy_database_is_migrated(tmp_path):
+    manager = db.ConnectionManager(legacy_db(tmp_path))
+    with manager.connection() as conn:
+        db.init_schema(conn)
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+        assert conn.execute("SELECT done_date FROM latest_inspections").fetchall() == [("2025-01-10",)]
+        assert conn.execute("SELECT COUNT(*) FROM inspections WHERE uuid IS NULL").fetchone()[0] == 0
+    manager.close()
+
+
+def test_concurrent_upgrades_of_the_same_database(tmp_path):
+    path = legacy_db(tmp_path)
+    first = db.ConnectionManager(path)
+    second = db.ConnectionManager(path)
+    errors = []
+
+    def upgrade(manager):
+        try:
+            with manager.connection() as conn:
+                db.init_schema(conn)
+        except Exception as e:
+            errors.append(e)
+
+    # The first instance is mid-upgrade (holding the write lock) when the
+    # second one reads the old version and starts its own.
+    conn = first.open()
+    conn.execute("BEGIN IMMEDIATE")
+    waiting = threading.Thread(target=upgrade, args=(second,))
+    waiting.start()
+    time.sleep(0.2)
+    upgrade(first)
+    waiting.join()
+
+    assert errors == []
+    with second.connection() as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM latest_inspections").fetchone()[0] == 1
+    first.close()
+    second.close()
@@ -0,0 +1,35 @@
+from search_index import SearchIndex, normalize
+
+
+def index(*names):
+    return SearchIndex({"id": i, "name": name} for i, name in enumerate(names))
+
+
+def test_normalize_folds_width_case_and_kana():
+    assert normalize("ＡＢＣ　Ｃｏ") == normalize("abc co")
+    assert normalize("ｶﾀｶﾅ") == normalize("かたかな") == normalize("カタカナ")
+
+
+def test_substring_search():
+    idx = index("Acme Corp", "Beta Industries", "株式会社アクメ", "acme east")
+
+    assert idx.search("") is None
+    assert idx.search("ACME") == {0, 3}
+    assert idx.search("s") == {1, 3}
+    assert idx.search("あくめ") == {2}
+    assert idx.search("me co") == {0}
+    assert idx.search("zeta") == set()
+
+
+def test_add_and_remove_update_postings():
+    idx = index("Acme")
+
+    idx.add(0, "Beta")
+    idx.add(1, "Acme")
+    idx.remove(5)
+
+    assert idx.search("acme") == {1}
+    assert idx.search("beta") == {0}
+    idx.remove(1)
+    assert idx.search("acme") == set()
+    assert len(idx) == 1